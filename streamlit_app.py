@@ -1,39 +1,107 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, TimeSeriesSplit, RandomizedSearchCV
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, r2_score
-from lightgbm import LGBMRegressor
-import plotly.express as px
-import plotly.graph_objects as go
-from typing import Optional, Dict, Any
+# sklearn/lightgbm은 임포트 비용이 커서 실제 사용하는 함수/블록 안에서 지연 임포트
+from typing import Optional
 import io
 import gspread
 from google.oauth2.service_account import Credentials
 import os
 import json
-from functools import partial
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import holidays
 
 # 성능 관련 상수
 APPLY_SHEET_FORMATTING = False  # 구글시트 업데이트 시 서식 적용 여부 (속도 개선을 위해 기본 비활성화)
 QUICK_SHEET_CONNECT = True      # 구글시트 연결 시 검증 호출 생략하여 초기 로딩 가속
+EDITOR_PAGE_ROWS = 1000         # 데이터 편집기에 한 번에 보내는 최대 행 수 (초과 시 구간 선택)
+MODEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')  # 학습 모델 디스크 캐시 (서버 재시작 후 재학습 방지)
+MODEL_CACHE_MAX_AGE_SEC = 7 * 24 * 3600  # 이 기간 동안 쓰이지 않은 이전 데이터 버전 모델 파일만 정리
+
+# 요일 이름 (weekday 코드 0=월요일 ~ 6=일요일 순서)
+WEEKDAY_NAMES = ['월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일']
+WEEKDAY_INDEX = {name: i for i, name in enumerate(WEEKDAY_NAMES)}
 
 # 학습 캐싱 함수들
+def model_cache_path(prefix: str, X: pd.DataFrame, y: pd.Series, **params) -> str:
+    """학습 데이터(값/컬럼)·파라미터·sklearn 버전 지문으로 만든 모델 파일 경로"""
+    import sklearn
+    digest = hashlib.md5()
+    digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+    digest.update(repr((list(X.columns), sorted(params.items()), sklearn.__version__)).encode('utf-8'))
+    return os.path.join(MODEL_CACHE_DIR, f'{prefix}_{digest.hexdigest()}.joblib')
+
+def load_cached_model(path: str):
+    """디스크에 저장된 모델 로드 (없거나 읽기 실패 시 None)"""
+    try:
+        if os.path.exists(path):
+            import joblib
+            model = joblib.load(path)
+            os.utime(path)  # 사용 중인 모델은 오래된 파일 정리 대상에서 제외되도록 갱신
+            return model
+    except Exception:
+        pass
+    return None
+
+def store_cached_model(path: str, model) -> None:
+    """모델을 압축 저장 (임시 파일에 쓴 뒤 교체해 동시 로드가 반쯤 쓰인 파일을 읽지 않도록 함, 쓰기 불가 환경이면 조용히 건너뜀)
+    - 같은 종류의 이전 데이터 버전 파일은 MODEL_CACHE_MAX_AGE_SEC 동안 쓰이지 않은 것만 정리
+      (다른 데이터 버전으로 동시에 접속한 세션의 모델을 지우지 않도록)
+    """
+    tmp_path = None
+    try:
+        import joblib
+        import tempfile
+        cache_dir, file_name = os.path.split(path)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{file_name}.', suffix='.tmp', dir=cache_dir)
+        with os.fdopen(fd, 'wb') as f:
+            joblib.dump(model, f, compress=3)
+        os.replace(tmp_path, path)
+        tmp_path = None
+        prefix = file_name.rsplit('_', 1)[0]
+        stale_before = time.time() - MODEL_CACHE_MAX_AGE_SEC
+        for old_name in os.listdir(cache_dir):
+            old_path = os.path.join(cache_dir, old_name)
+            if old_name.rsplit('_', 1)[0] == prefix and old_name != file_name and os.path.getmtime(old_path) < stale_before:
+                os.remove(old_path)
+    except Exception:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
 @st.cache_resource(show_spinner=False)
-def train_rf_model(X: pd.DataFrame, y: pd.Series, *, n_estimators: int, random_state: int) -> RandomForestRegressor:
+def train_rf_model(X: pd.DataFrame, y: pd.Series, *, n_estimators: int, random_state: int):
+    cache_path = model_cache_path('rf', X, y, n_estimators=n_estimators, random_state=random_state)
+    model = load_cached_model(cache_path)
+    if model is not None:
+        return model
+    from sklearn.ensemble import RandomForestRegressor
     model = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state, n_jobs=-1)
     model.fit(X, y)
+    store_cached_model(cache_path, model)
     return model
 
+@st.cache_resource(show_spinner=False)
 def tune_rf_model(
     X: pd.DataFrame,
     y: pd.Series,
     *,
     random_state: int,
 ):
-    """간단한 시계열 CV 기반 RandomForest 튜닝."""
+    """간단한 시계열 CV 기반 RandomForest 튜닝. (학습 데이터/시드가 같으면 재실행 시 캐시 재사용, 서버 재시작 시 디스크 캐시 재사용)"""
+    cache_path = model_cache_path('rf_tuned', X, y, random_state=random_state)
+    model = load_cached_model(cache_path)
+    if model is not None:
+        return model
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.model_selection import TimeSeriesSplit, RandomizedSearchCV
     # 시계열 분할 (인덱스 순서를 시간 순서로 가정)
     tscv = TimeSeriesSplit(n_splits=3)
     param_distributions = {
@@ -53,24 +121,26 @@ def tune_rf_model(
         verbose=0,
     )
     search.fit(X, y)
+    store_cached_model(cache_path, search.best_estimator_)
     return search.best_estimator_
 
 def chronological_split(
     X: pd.DataFrame,
     y: pd.Series,
-    dates: pd.Series,
+    dates,
     *,
     test_size: float,
 ):
     """시간 순서(오름차순)로 학습/평가 세트를 분할합니다.
 
+    dates는 X와 같은 길이의 정렬 키(날짜 또는 이미 시간순인 행 위치)입니다.
     마지막 test_size 비율 구간을 테스트로 사용합니다.
     """
     try:
-        # 정렬용 인덱스
-        sort_idx = dates.sort_values().index
-        X_sorted = X.loc[sort_idx]
-        y_sorted = y.loc[sort_idx]
+        # 정렬용 위치 (이미 정렬된 키면 순서 그대로)
+        sort_pos = np.argsort(np.asarray(dates), kind='mergesort')
+        X_sorted = X.iloc[sort_pos]
+        y_sorted = y.iloc[sort_pos]
         split_idx = int(len(X_sorted) * (1 - test_size))
         split_idx = max(1, min(split_idx, len(X_sorted) - 1))
         return (
@@ -83,23 +153,102 @@ def chronological_split(
         # 실패 시 안전하게 전체를 학습으로 반환
         return X, X.iloc[0:0], y, y.iloc[0:0]
 
-def align_features_for_model(model, df: pd.DataFrame) -> pd.DataFrame:
-    """모델 학습 시 사용한 컬럼 집합(feature_names_in_)에 입력을 정렬.
-    - 학습 시 있었던 컬럼이 예측 시 없으면 0으로 생성
-    - 학습 시 없던 컬럼은 드롭
-    - 컬럼 순서 일치
+def eval_data_fingerprint(X: pd.DataFrame, y: pd.Series) -> tuple:
+    """검증 세트 지문 (행 수, 컬럼, 값 해시) - 평가 결과 재사용 여부 판단용"""
+    return (
+        len(X),
+        tuple(X.columns),
+        int(pd.util.hash_pandas_object(X, index=False).sum()),
+        int(pd.util.hash_pandas_object(y, index=False).sum()),
+    )
+
+def is_missing(x) -> bool:
+    """스칼라 결측 여부 (None 또는 NaN) - pd.isna의 타입 추론 없이 판별"""
+    return x is None or (isinstance(x, float) and x != x)
+
+def make_fast_predict(model):
+    """단일 행 예측용 클로저 생성.
+    - RandomForest 계열: 전체 트리 노드를 하나의 평탄 배열로 합쳐 모든 트리를 동시에 한 깊이씩 순회 (입력 검증 생략)
+    - LightGBM 계열: sklearn 래퍼를 거치지 않고 내부 Booster에 ndarray 버퍼를 직접 전달
+    - 그 외 모델: feature_names_in_ 순서의 DataFrame으로 일반 predict 호출
+    반환 함수는 feature_names_in_ 순서의 값 시퀀스를 받아 float 예측값을 돌려준다.
     """
-    try:
-        feature_names = list(getattr(model, 'feature_names_in_', []))
-        if feature_names:
-            for col in feature_names:
-                if col not in df.columns:
-                    df[col] = 0.0
-            # 여분 컬럼 제거 및 순서 정렬
-            df = df[feature_names]
-    except Exception:
-        pass
-    return df
+    feature_names = list(getattr(model, 'feature_names_in_', []))
+    estimators = getattr(model, 'estimators_', None)
+    if estimators and all(hasattr(est, 'tree_') for est in estimators):
+        trees = [est.tree_ for est in estimators]
+        offsets = np.concatenate([[0], np.cumsum([t.node_count for t in trees])[:-1]]).astype(np.intp)
+        # 노드 필드를 연속 구조체-배열(SoA)로 구성: 자식 인덱스는 평탄 배열 기준으로 이동하고,
+        # 리프는 자기 자신을 가리키게 해(임계값 +inf) 리프 판정 없이 max_depth 만큼 고정 순회
+        left_parts, right_parts, feature_parts, threshold_parts = [], [], [], []
+        for t, off in zip(trees, offsets):
+            is_leaf = t.children_left < 0
+            self_idx = np.arange(t.node_count) + off
+            left_parts.append(np.where(is_leaf, self_idx, t.children_left + off))
+            right_parts.append(np.where(is_leaf, self_idx, t.children_right + off))
+            feature_parts.append(np.where(is_leaf, 0, t.feature))
+            threshold_parts.append(np.where(is_leaf, np.inf, t.threshold))
+        # 좌/우 자식을 [2i]=좌, [2i+1]=우 로 교차 배치해 비교 결과(0/1)로 바로 인덱싱
+        children = np.empty(2 * int(offsets[-1] + trees[-1].node_count), dtype=np.intp)
+        children[0::2] = np.concatenate(left_parts)
+        children[1::2] = np.concatenate(right_parts)
+        feature = np.ascontiguousarray(np.concatenate(feature_parts), dtype=np.intp)
+        # 임계값은 float32로 보관: 원래 값 이하인 가장 큰 float32로 내림해 float32 입력과의 비교 결과를 그대로 유지
+        threshold64 = np.concatenate(threshold_parts)
+        threshold = threshold64.astype(np.float32)
+        threshold = np.where(threshold > threshold64, np.nextafter(threshold, np.float32(-np.inf)), threshold).astype(np.float32)
+        value = np.ascontiguousarray(np.concatenate([t.value[:, 0, 0] for t in trees]), dtype=np.float64)
+        roots = offsets.astype(np.intp)
+        max_depth = max(t.max_depth for t in trees)
+
+        def fast_predict(vals) -> float:
+            # sklearn과 동일하게 float32로 내린 입력을 임계값과 비교
+            x = np.asarray(vals, dtype=np.float32)
+            nodes = roots
+            for _ in range(max_depth):
+                go_right = x.take(feature.take(nodes)) > threshold.take(nodes)
+                nodes = children.take((nodes << 1) + go_right)
+            return float(value.take(nodes).mean())
+        return fast_predict
+
+    booster = getattr(model, 'booster_', None)
+    if booster is not None:
+        X_buf = np.empty((1, booster.num_feature()), dtype=np.float64)
+
+        def booster_predict(vals) -> float:
+            X_buf[0] = vals
+            return float(booster.predict(X_buf)[0])
+        return booster_predict
+
+    def slow_predict(vals) -> float:
+        frame = pd.DataFrame([list(vals)], columns=feature_names) if feature_names else np.asarray(vals, dtype=float).reshape(1, -1)
+        return float(model.predict(frame)[0])
+    return slow_predict
+
+def compute_temp_features(
+    temp_for_cooling: np.ndarray,
+    temp_min: Optional[np.ndarray],
+    temp_max: Optional[np.ndarray],
+    is_summer: np.ndarray,
+    is_winter: np.ndarray,
+    *,
+    cooling_base_temp: float,
+    heating_base_temp: float,
+):
+    """냉방강도/난방강도/일교차를 배열 연산으로 한 번에 계산합니다.
+
+    - 냉방강도: 여름철에만 max(냉방 기준 온도 - cooling_base_temp, 0)
+    - 난방강도: 겨울철에만 max(heating_base_temp - 최저기온, 0), 최저기온이 없으면 0
+    - 일교차: 최고기온 - 최저기온 (둘 중 하나라도 없으면 None)
+    """
+    cooling = np.maximum(temp_for_cooling - cooling_base_temp, 0.0) * is_summer
+    if temp_min is not None:
+        heating = np.maximum(heating_base_temp - temp_min, 0.0) * is_winter
+        diurnal = temp_max - temp_min if temp_max is not None else None
+    else:
+        heating = np.zeros_like(cooling)
+        diurnal = None
+    return cooling, heating, diurnal
 
 @st.cache_resource(show_spinner=False)
 def train_lgbm_gas_model(
@@ -113,6 +262,7 @@ def train_lgbm_gas_model(
     min_child_samples: int,
     random_state: int
 ):
+    from lightgbm import LGBMRegressor
     # 중요한 하이퍼파라미터만 캐시 키에 반영하도록 인자 유지
     model = LGBMRegressor(
         n_estimators=n_estimators,
@@ -126,6 +276,11 @@ def train_lgbm_gas_model(
     model.fit(X, y)
     return model
 
+@st.cache_resource(show_spinner=False)
+def get_kr_holidays():
+    """한국 공휴일 달력 (재실행 간 공유, 데이터 범위 연도를 미리 채워 조회 시 지연 생성 방지)"""
+    return holidays.KR(years=range(2015, 2031))
+
 # 페이지 설정 (반드시 첫 번째 Streamlit 명령어여야 함)
 st.set_page_config(
     page_title="전력 수요 예측 시스템",
@@ -463,11 +618,10 @@ def load_data_from_sheet(client, sheet_name="power_data", sheet_id=None):
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         
-        # 날짜 컬럼을 년월일까지만 표시하도록 변환
+        # 날짜 컬럼은 로드 시 한 번만 datetime으로 변환 (표시용 문자열은 화면에서 한 번 생성)
         if '날짜' in df.columns:
             try:
-                # 날짜 컬럼을 datetime으로 변환 후 년월일까지만 표시
-                df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce').dt.strftime('%Y-%m-%d')
+                df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce')
             except Exception as e:
                 st.warning(f"날짜 변환 중 오류: {e}")
         
@@ -484,8 +638,169 @@ def load_data_from_sheet_cached(sheet_name="power_data", sheet_id=None):
         return None
     return load_data_from_sheet(client, sheet_name, sheet_id)
 
-def save_data_to_sheet(client, data, sheet_name="power_data", sheet_id=None, original_data=None):
-    """구글 시트에 데이터 저장 (변경된 부분만 업데이트)"""
+@st.cache_data(show_spinner=False)
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """다운로드용 CSV 바이트 (데이터 변경 시에만 재생성)"""
+    return df.to_csv(index=False).encode('utf-8')
+
+@st.cache_data(show_spinner=False)
+def summarize_dates(dates: pd.Series):
+    """날짜 컬럼 표시용 요약: (년월일 문자열 Series, 시작일, 종료일) - 데이터 변경 시에만 재계산"""
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors='coerce')
+    start, end = dates.min(), dates.max()
+    return (
+        dates.dt.strftime('%Y-%m-%d'),
+        start.strftime('%Y-%m-%d') if pd.notna(start) else "N/A",
+        end.strftime('%Y-%m-%d') if pd.notna(end) else "N/A",
+    )
+
+@st.cache_data(show_spinner=False)
+def compute_data_stats(df: pd.DataFrame):
+    """통계 탭용 요약 (수치형 describe, 범주형 value_counts, 결측값) - 데이터 변경 시에만 재계산"""
+    numeric_df = df.select_dtypes(include=['number'])
+    numeric_stats = numeric_df.describe() if len(numeric_df.columns) > 0 else None
+    # pandas 3의 str dtype 컬럼도 명시적으로 포함 ('object'만 지정 시 암묵 포함은 deprecated)
+    # 요일은 Step 1에서 Categorical로 생성되므로 'category'도 포함
+    categorical_counts = {col: df[col].value_counts() for col in df.select_dtypes(include=['object', 'string', 'category']).columns}
+    missing_data = df.isnull().sum()
+    return numeric_stats, categorical_counts, missing_data
+
+@st.cache_data(show_spinner=False)
+def build_sorted_history(df: pd.DataFrame) -> pd.DataFrame:
+    """날짜를 datetime으로 변환하고 날짜순 정렬한 이력 (래그 조회용, 데이터 변경 시에만 재계산)
+    - 날짜가 없는 행은 제외해 날짜 배열이 단조 증가하도록 유지 (이진 탐색 조회용)
+    """
+    df = df.copy()
+    if not pd.api.types.is_datetime64_any_dtype(df['날짜']):  # Step 1 이후에는 이미 datetime이므로 재파싱 생략
+        df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce')
+    df = df[df['날짜'].notna()]
+    if '최대수요' in df.columns:
+        df['최대수요'] = pd.to_numeric(df['최대수요'], errors='coerce')
+    return df.sort_values('날짜', kind='mergesort').reset_index(drop=True)
+
+@st.cache_data(show_spinner=False)
+def build_processed_base(df: pd.DataFrame):
+    """특징 공학 기본 프레임: 요일 더미, 공휴일/업무일 보존, 날짜순 정렬, 어제 수요 래그 (데이터 변경 시에만 재계산)
+    반환: (프레임, 요일 더미 컬럼 목록) - 더미 컬럼은 여기서 한 번만 스캔
+    """
+    # 요일 범주를 월~일 순서로 고정해 데이터에 없는 요일이 있어도 더미 컬럼 구성/순서가 항상 같도록 함
+    # (시트의 요일 값이 표준 이름이 아니면 뒤에 덧붙여 정보 손실 없이 유지)
+    if '요일' in df.columns and not (isinstance(df['요일'].dtype, pd.CategoricalDtype) and list(df['요일'].cat.categories) == WEEKDAY_NAMES):
+        extra_days = sorted(set(df['요일'].dropna()) - set(WEEKDAY_NAMES), key=str)
+        df = df.assign(요일=pd.Categorical(df['요일'], categories=WEEKDAY_NAMES + extra_days))
+    # 요일 더미 생성(모든 요일 포함) - 학습 행렬과 같은 float32로 바로 생성해 이후 변환 생략
+    processed = pd.get_dummies(df, columns=['요일'], drop_first=False, dtype=np.float32)
+    # 더미 컬럼은 기존(문자열 요일) 방식과 같은 이름순으로 배치 - 특성 순서가 바뀌면 랜덤포레스트 분할 선택이 달라져 결과가 바뀜
+    dummy_cols = [col for col in processed.columns if col.startswith('요일_')]
+    processed = processed[[col for col in processed.columns if not col.startswith('요일_')] + sorted(dummy_cols)]
+    try:
+        # 공휴일 플래그도 보존(모델 입력 여부는 features_max 구성에 따름)
+        processed['공휴일'] = df.get('공휴일', 0)
+        # 업무일은 이미 데이터에 생성되어 있음
+        if '업무일' in df.columns:
+            processed['업무일'] = df['업무일'].astype(int)
+    except Exception:
+        pass
+    # 날짜 오름차순 정렬 (shift 기반 래그/시간순 분할이 행 순서에 의존하므로 한 번만 정렬)
+    processed = processed.sort_values('날짜', kind='mergesort').reset_index(drop=True)
+    # 어제 수요 래그 (t-1)
+    try:
+        processed['어제의_최대수요'] = pd.to_numeric(processed['최대수요'], errors='coerce').shift(1)
+    except Exception:
+        processed['어제의_최대수요'] = 0.0
+    weekday_dummy_cols = [col for col in processed.columns if col.startswith('요일_')]
+    return processed, weekday_dummy_cols
+
+@lru_cache(maxsize=4096)
+def last_year_week_dates(year: int, month: int, day: int) -> pd.DatetimeIndex:
+    """작년 동일 주(월~일) 7일 날짜 (2/29는 작년 2/28 기준)"""
+    ts = pd.Timestamp(year=year, month=month, day=day)
+    prev_year = year - 1
+    try:
+        anchor = ts.replace(year=prev_year)
+    except ValueError:
+        if (month, day) == (2, 29):
+            anchor = pd.Timestamp(year=prev_year, month=2, day=28)
+        else:
+            anchor = ts - pd.Timedelta(days=365)
+    week_start = anchor - pd.Timedelta(days=int(anchor.weekday()))
+    return pd.date_range(week_start, periods=7, freq='D')
+
+@st.cache_data(show_spinner=False)
+def build_date_index(df: pd.DataFrame) -> pd.DataFrame:
+    """날짜(date) 인덱스 프레임 (특정 일자 행 조회를 해시 조회로 처리, 데이터 변경 시에만 재계산)"""
+    df = df.copy()
+    if not pd.api.types.is_datetime64_any_dtype(df['날짜']):  # 이미 datetime이면 그대로 사용
+        df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce')
+    # 조회에 쓰는 수치 컬럼은 여기서 한 번만 변환
+    for col in ('최저기온', '최고기온', '체감온도', '최대수요'):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    # 시트의 '평일' 표기를 정수 플래그로 미리 변환 (1=평일, 0=그 외)
+    if '평일' in df.columns:
+        df['_is_weekday_sheet'] = (df['평일'].astype(str) == '평일').astype(np.int8)
+    return df.set_index(df['날짜'].dt.date)
+
+def sheet_row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """시트 저장 기준(월 컬럼 제외, 문자열 값)의 행별 해시 - 원본 대비 변경 행 감지용"""
+    if '월' in df.columns:
+        df = df.drop(columns=['월'])
+    return pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+
+def call_with_backoff(func, *args, max_retries: int = 5, base_delay: float = 1.0, **kwargs):
+    """구글 시트 API 호출 재시도 (요청 한도 초과/서버 오류 시 지수 백오프)"""
+    for attempt in range(max_retries):
+        try:
+            return func(*args, **kwargs)
+        except gspread.exceptions.APIError as e:
+            if e.code not in (429, 500, 502, 503, 504) or attempt == max_retries - 1:
+                raise
+            time.sleep(base_delay * (2 ** attempt))
+
+def to_sheet_values(df: pd.DataFrame) -> list:
+    """시트 기록용 문자열 2차원 리스트 (컬럼 단위 변환)
+    - 날짜형 컬럼과 ISO 형식('T' 포함) 날짜 문자열은 년월일(YYYY-MM-DD)로 표시
+    - 결측값은 빈 문자열
+    """
+    # 바뀌는 컬럼만 모아 교체 (전체 프레임 복사 없음)
+    converted = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            converted[col] = series.dt.strftime('%Y-%m-%d')
+        elif series.dtype == object or pd.api.types.is_string_dtype(series):
+            # object 컬럼은 문자열 셀만 검사 (편집기가 되돌려 준 숫자 등 비문자열 셀이 섞이거나 전부여도 안전)
+            text = series.where(series.map(lambda v: isinstance(v, str))) if series.dtype == object else series
+            iso_mask = text.str.contains('T', regex=False, na=False)
+            if iso_mask.any():
+                parsed = pd.to_datetime(series[iso_mask], errors='coerce', format='ISO8601')
+                parsed = parsed[parsed.notna()]
+                fixed = series.astype(object)
+                fixed.loc[parsed.index] = parsed.dt.strftime('%Y-%m-%d')
+                converted[col] = fixed
+    out = df.assign(**converted) if converted else df
+    return out.astype(str).where(out.notna(), '').values.tolist()
+
+def to_excel_bytes(df: pd.DataFrame, sheet_name: str = 'Power_Data') -> bytes:
+    """엑셀(xlsx) 바이트 생성 - xlsxwriter가 있으면 사용(openpyxl보다 가벼움), 없으면 openpyxl
+    (pandas는 열 단위로 셀을 기록하므로 행을 먼저 내보내는 constant_memory 모드는 쓰지 않음)
+    """
+    excel_buffer = io.BytesIO()
+    try:
+        writer = pd.ExcelWriter(excel_buffer, engine='xlsxwriter')
+    except ImportError:
+        writer = pd.ExcelWriter(excel_buffer, engine='openpyxl')
+    with writer:
+        df.to_excel(writer, index=False, sheet_name=sheet_name)
+    return excel_buffer.getvalue()
+
+def save_data_to_sheet(client, data, sheet_name="power_data", sheet_id=None, original_hashes=None):
+    """구글 시트에 데이터 저장 (변경된 부분만 업데이트)
+
+    original_hashes는 마지막으로 시트와 동기화된 데이터의 sheet_row_hashes 결과입니다.
+    백그라운드 스레드에서 실행되므로 st.* 출력 없이 (성공 여부, 메시지)만 반환합니다.
+    """
     try:
         # 시트 열기 (ID가 제공된 경우 ID로, 아니면 이름으로)
         if sheet_id and sheet_id.strip():
@@ -494,139 +809,116 @@ def save_data_to_sheet(client, data, sheet_name="power_data", sheet_id=None, ori
             sheet = client.open(sheet_name).sheet1
         
         # 월 컬럼 제거 (내부 계산용이므로 구글 시트에 저장하지 않음)
-        data_to_save = data.copy()
-        if '월' in data_to_save.columns:
-            data_to_save = data_to_save.drop(columns=['월'])
+        # (호출 측에서 이미 저장용 스냅샷을 넘기므로 여기서는 다시 복사하지 않음)
+        data_to_save = data.drop(columns=['월']) if '월' in data.columns else data
         
-        # 원본 데이터도 월 컬럼 제거하여 비교
-        original_data_to_compare = None
-        if original_data is not None:
-            original_data_to_compare = original_data.copy()
-            if '월' in original_data_to_compare.columns:
-                original_data_to_compare = original_data_to_compare.drop(columns=['월'])
-        
-        # 원본 데이터가 제공된 경우 변경된 부분만 감지
-        if original_data_to_compare is not None:
-            # 변경된 행과 열 감지
-            changed_rows = []
-            changed_columns = []
-            
-            # 데이터 타입 통일을 위해 문자열로 변환하여 비교
-            data_str = data_to_save.astype(str)
-            original_str = original_data_to_compare.astype(str)
-            
-            # 변경된 행 감지
-            for idx in range(len(data_to_save)):
-                if idx < len(original_str) and not data_str.iloc[idx].equals(original_str.iloc[idx]):
-                    changed_rows.append(idx + 2)  # +2는 헤더(1)와 0-based 인덱스(1) 때문
-            
-            # 변경된 열 감지
-            for col in data_to_save.columns:
-                if col in original_str.columns and not data_str[col].equals(original_str[col]):
-                    changed_columns.append(col)
+        # 원본 행 해시가 제공되고 행 수가 같으면 변경된 부분만 감지
+        # (행 추가/삭제 시에는 아래 전체 업데이트 경로에서 남는 행까지 정리)
+        if original_hashes is not None and len(data_to_save) == len(original_hashes):
+            # 변경된 행 감지 (행별 해시 비교)
+            current_hashes = sheet_row_hashes(data_to_save)
+            changed_idx = np.nonzero(current_hashes != original_hashes)[0]
+            changed_rows = changed_idx + 2  # +2는 헤더(1)와 0-based 인덱스(1) 때문 (오름차순)
             
             # 변경된 부분만 업데이트 (최적화된 배치 방식)
-            if changed_rows:
-                # 변경된 행들을 하나의 연속된 범위로 그룹화
-                changed_rows.sort()  # 행 번호 정렬
-                
-                # 연속된 행들을 그룹으로 나누기
-                row_groups = []
-                current_group = [changed_rows[0]]
+            if len(changed_rows) > 0:
+                # 연속된 행 번호끼리 그룹화 (간격이 1이 아닌 지점에서 분할)
+                break_points = np.nonzero(np.diff(changed_rows) != 1)[0] + 1
+                row_groups = [group.tolist() for group in np.split(changed_rows, break_points)]
                 
-                for i in range(1, len(changed_rows)):
-                    if changed_rows[i] == changed_rows[i-1] + 1:
-                        # 연속된 행
-                        current_group.append(changed_rows[i])
-                    else:
-                        # 불연속된 행 - 새 그룹 시작
-                        row_groups.append(current_group)
-                        current_group = [changed_rows[i]]
-                
-                row_groups.append(current_group)  # 마지막 그룹 추가
-                
-                # 각 그룹을 하나의 범위로 업데이트
+                # 각 그룹을 하나의 범위로 모아 단일 batch_update 요청으로 전송
+                batch_data = []
+                format_errors = []
                 for group in row_groups:
                     start_row = group[0]
                     end_row = group[-1]
                     
-                    # 해당 범위의 데이터 추출
-                    group_data = data_to_save.iloc[start_row-2:end_row-1]  # -2는 인덱스 조정
+                    # 해당 범위의 데이터를 시트 기록용 문자열로 변환
+                    group_values = to_sheet_values(data_to_save.iloc[start_row-2:end_row-1])  # -2는 인덱스 조정
                     
-                    # 각 행을 문자열로 변환
-                    group_values = []
-                    for _, row in group_data.iterrows():
-                        row_values = []
-                        for val in row:
-                            if pd.isna(val):
-                                row_values.append('')
-                            elif isinstance(val, pd.Timestamp):
-                                row_values.append(val.strftime('%Y-%m-%d'))
-                            elif isinstance(val, str) and 'T' in val:
-                                try:
-                                    date_obj = pd.to_datetime(val)
-                                    row_values.append(date_obj.strftime('%Y-%m-%d'))
-                                except:
-                                    row_values.append(str(val))
-                            else:
-                                row_values.append(str(val))
-                        group_values.append(row_values)
-                    
-                    # 범위 업데이트 (연속된 행들을 한 번에)
-                    range_name = f'A{start_row}:{chr(65 + len(group_values[0]) - 1)}{end_row}'
+                    # 범위 업데이트 (연속된 행들을 한 번에, Z열 이후도 올바른 A1 표기)
+                    range_name = f'A{start_row}:{gspread.utils.rowcol_to_a1(end_row, len(group_values[0]))}'
                     
                     # 서식 복사: 바로 위 행의 서식을 따라가도록 설정
                     try:
                         if APPLY_SHEET_FORMATTING and start_row > 2:  # 옵션: 서식 적용
-                            format_range = f'A{start_row}:{chr(65 + len(group_values[0]) - 1)}{end_row}'
-                            sheet.format(format_range, {
+                            sheet.format(range_name, {
                                 "textFormat": {
                                     "fontSize": 11,
                                     "fontFamily": "Arial"
                                 }
                             })
                     except Exception as e:
-                        st.warning(f"⚠️ 서식 적용 실패: {str(e)}")
+                        format_errors.append(str(e))
                     
-                    # 데이터 업데이트
-                    # 빠른 업데이트(배치) 모드
-                    sheet.update(range_name, group_values, value_input_option='RAW')
+                    batch_data.append({'range': range_name, 'values': group_values})
+                
+                # 데이터 업데이트 (모든 그룹을 한 번의 API 호출로)
+                call_with_backoff(sheet.batch_update, batch_data, value_input_option='RAW')
                 
-                return True, f"✅ {len(changed_rows)}개 행이 {len(row_groups)}개 그룹으로 업데이트되었습니다."
+                message = f"✅ {len(changed_rows)}개 행이 {len(row_groups)}개 그룹으로 업데이트되었습니다."
+                if format_errors:
+                    message += f" (⚠️ 서식 적용 실패: {format_errors[0]})"
+                return True, message
         
         # 원본 데이터가 없거나 전체 업데이트가 필요한 경우
-        # 날짜 컬럼을 년월일까지만 표시하도록 변환
-        for col in data_to_save.columns:
-            if data_to_save[col].dtype == 'datetime64[ns]':
-                data_to_save[col] = data_to_save[col].dt.strftime('%Y-%m-%d')
-            elif data_to_save[col].dtype == 'object':
-                # 문자열 컬럼에서 날짜 형식인지 확인
-                try:
-                    # 첫 번째 유효한 값으로 날짜 형식 확인
-                    first_valid = data_to_save[col].dropna().iloc[0] if len(data_to_save[col].dropna()) > 0 else None
-                    if first_valid and isinstance(first_valid, str) and ('T' in first_valid or '-' in first_valid):
-                        # 날짜 형식으로 변환 시도
-                        data_to_save[col] = pd.to_datetime(data_to_save[col], errors='coerce').dt.strftime('%Y-%m-%d')
-                except:
-                    pass  # 변환 실패 시 원본 유지
-        
         # 모든 데이터를 한 번에 업데이트 (API 호출 최소화)
-        all_values = [data_to_save.columns.tolist()]  # 헤더
-        for _, row in data_to_save.iterrows():
-            # 각 값을 문자열로 변환
-            row_values = [str(val) if val is not None else '' for val in row.tolist()]
-            all_values.append(row_values)
+        all_values = [data_to_save.columns.tolist()] + to_sheet_values(data_to_save)  # 헤더 + 데이터
         
-        # 시트를 한 번에 업데이트
-        sheet.clear()
-        sheet.update('A1', all_values, value_input_option='RAW')
+        # 새 데이터 크기에 맞춘 범위를 한 번에 덮어쓰기
+        n_rows, n_cols = len(all_values), len(all_values[0])
+        if original_hashes is None:
+            # 이전 행 수를 모르면 시트를 비운 뒤 기록
+            call_with_backoff(sheet.clear)
+        call_with_backoff(sheet.update, f'A1:{gspread.utils.rowcol_to_a1(n_rows, n_cols)}', all_values, value_input_option='RAW')
+        if original_hashes is not None:
+            # 이전보다 행이 줄었으면 남는 행, 열이 줄었으면 남는 열만 비우기 (헤더 1행 + 이전 데이터 행)
+            old_rows = len(original_hashes) + 1
+            stale_ranges = []
+            if old_rows > n_rows:
+                stale_ranges.append(f'A{n_rows + 1}:{gspread.utils.rowcol_to_a1(old_rows, max(n_cols, sheet.col_count))}')
+            if sheet.col_count > n_cols:
+                stale_ranges.append(f'{gspread.utils.rowcol_to_a1(1, n_cols + 1)}:{gspread.utils.rowcol_to_a1(n_rows, sheet.col_count)}')
+            if stale_ranges:
+                call_with_backoff(sheet.batch_clear, stale_ranges)
         
         return True, "✅ 전체 데이터가 업데이트되었습니다."
         
     except Exception as e:
-        st.error(f"❌ 시트 데이터 저장 오류: {str(e)}")
         return False, f"❌ 저장 실패: {str(e)}"
 
+# 구글 시트 저장 전용 백그라운드 실행기 (동시 저장 방지를 위해 단일 워커)
+@st.cache_resource(show_spinner=False)
+def get_save_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=1)
+
+@st.fragment(run_every=1.0)
+def render_save_status():
+    """백그라운드 저장 작업을 주기적으로 확인하고, 완료되면 결과를 남기고 앱을 새로고침"""
+    save_future = st.session_state.get('save_future')
+    if save_future is None:
+        return
+    if not save_future.done():
+        st.info("⏳ 구글 시트에 저장 중... (변경된 부분만 업데이트)")
+        return
+
+    st.session_state.pop('save_future', None)
+    saved_data = st.session_state.pop('save_pending_data', None)
+    try:
+        success, message = save_future.result()
+    except Exception as e:
+        success, message = False, f"❌ 저장 실패: {str(e)}"
+
+    if success and saved_data is not None:
+        # 원본 데이터 업데이트 (다음 편집을 위해)
+        st.session_state.original_data_hash = sheet_row_hashes(saved_data)
+        # 시트 내용이 바뀌었으므로 TTL 캐시된 시트 로드 결과 무효화 (새 세션이 이전 값을 받지 않도록)
+        load_data_from_sheet_cached.clear()
+        # 페이지 새로고침을 위한 세션 상태 업데이트
+        st.session_state.data_updated = True
+    st.session_state.save_result = (success, message)
+    st.rerun()
+
 # 사이드바 제거됨 (요청에 따라 비표시)
 
 # 전역 로딩 상태 표시 플레이스홀더 (Step 0 위)
@@ -640,6 +932,8 @@ st.subheader("🔐 구글 시트 연결 설정")
 
 client = setup_google_sheets()
 if client is None:
+    # 연결 실패(None)는 캐시에 남기지 않아 다음 재실행 때 다시 인증을 시도
+    setup_google_sheets.clear()
     st.warning("⚠️ 구글 시트 연결이 일시적으로 지연됩니다. 캐시된 데이터를 불러옵니다.")
 
 # 구글 시트 설정 정보
@@ -656,7 +950,7 @@ with refresh_col1:
             pass
         # 세션 상태 초기화(데이터 및 의존 상태)
         for k in [
-            'data', 'original_data',
+            'data', 'original_data_hash',
             'dynamic_max_features', 'max_series_tail',
             'last_gas', 'prev_gas',
         ]:
@@ -670,7 +964,7 @@ with refresh_col1:
                 fresh = load_data_from_sheet_cached(sheet_name, sheet_id)
             if fresh is not None:
                 st.session_state.data = fresh
-                st.session_state.original_data = fresh.copy()
+                st.session_state.original_data_hash = sheet_row_hashes(fresh)
                 st.success("✅ 최신 데이터로 갱신되었습니다.")
                 st.rerun()
             else:
@@ -684,7 +978,7 @@ if 'data' not in st.session_state:
             data = load_data_from_sheet(client, sheet_name, sheet_id)
         if data is not None:
             st.session_state.data = data
-            st.session_state.original_data = data.copy()
+            st.session_state.original_data_hash = sheet_row_hashes(data)
         else:
             st.error("❌ 데이터 로딩에 실패했습니다.")
             st.stop()
@@ -699,6 +993,15 @@ data = st.session_state.data
 # 데이터 편집 기능
 st.subheader("📊 데이터 미리보기 및 편집")
 
+# 시작/종료일 및 화면 표시용 문자열(년월일)은 캐시된 요약에서 한 번에 가져와 Step 0/1에서 함께 사용
+date_display = None
+start_date = end_date = "N/A"
+if '날짜' in data.columns:
+    try:
+        date_display, start_date, end_date = summarize_dates(data['날짜'])
+    except (ValueError, TypeError) as e:
+        st.warning(f"날짜 변환 오류: {e}")
+
 # 데이터 정보 표시
 col1, col2, col3, col4 = st.columns(4)
 with col1:
@@ -707,27 +1010,8 @@ with col2:
     st.metric("총 컬럼 수", f"{len(data.columns)}개")
 with col3:
     # 날짜 컬럼이 있으면 년월일까지만 표시
-    if '날짜' in data.columns:
-        try:
-            # 날짜 컬럼을 datetime으로 변환
-            date_data = pd.to_datetime(data['날짜'], errors='coerce')
-            start_date = date_data.min().strftime('%Y-%m-%d')
-        except (ValueError, TypeError) as e:
-            st.warning(f"날짜 변환 오류: {e}")
-            start_date = "N/A"
-    else:
-        start_date = "N/A"
     st.metric("시작일", start_date)
 with col4:
-    if '날짜' in data.columns:
-        try:
-            date_data = pd.to_datetime(data['날짜'], errors='coerce')
-            end_date = date_data.max().strftime('%Y-%m-%d')
-        except (ValueError, TypeError) as e:
-            st.warning(f"날짜 변환 오류: {e}")
-            end_date = "N/A"
-    else:
-        end_date = "N/A"
     st.metric("종료일", end_date)
 
 # 데이터 편집 탭
@@ -737,21 +1021,15 @@ with tab1:
     st.subheader("전체 데이터 미리보기")
     
     # 날짜 컬럼이 있으면 년월일까지만 표시하도록 변환
-    display_data = data.copy()
-    if '날짜' in display_data.columns:
-        try:
-            # datetime으로 변환 후 년월일까지만 표시
-            display_data['날짜'] = pd.to_datetime(display_data['날짜'], errors='coerce').dt.strftime('%Y-%m-%d')
-        except Exception as e:
-            st.warning(f"날짜 표시 변환 중 오류: {e}")
+    # (표시 전용이므로 날짜 형식을 바꿀 때만 새 프레임 생성)
+    display_data = data.assign(날짜=date_display) if date_display is not None else data
     
     st.dataframe(display_data, use_container_width=True)
     
-    # 데이터 다운로드
-    csv = data.to_csv(index=False)
+    # 데이터 다운로드 (재실행마다 CSV를 다시 만들지 않도록 캐시)
     st.download_button(
         label="📥 데이터를 CSV로 다운로드",
-        data=csv,
+        data=to_csv_bytes(data),
         file_name="power_data_edited.csv",
         mime="text/csv"
     )
@@ -762,18 +1040,12 @@ with tab2:
     # 편집용 데이터 준비 (세션 상태 사용하여 안정성 확보)
     if 'edit_data' not in st.session_state:
         # 처음 로드할 때만 편집용 데이터 준비
-        edit_data = data.copy()
+        # 월 컬럼이 있으면 제거 (내부 계산용이므로 편집 불가) - drop/assign이 새 프레임을 만들므로 별도 복사 불필요
+        edit_data = data.drop(columns=['월']) if '월' in data.columns else data
         
-        # 월 컬럼이 있으면 제거 (내부 계산용이므로 편집 불가)
-        if '월' in edit_data.columns:
-            edit_data = edit_data.drop(columns=['월'])
-        
-        if '날짜' in edit_data.columns:
-            try:
-                # datetime으로 변환 후 년월일까지만 표시
-                edit_data['날짜'] = pd.to_datetime(edit_data['날짜'], errors='coerce').dt.strftime('%Y-%m-%d')
-            except Exception as e:
-                st.warning(f"날짜 편집 변환 중 오류: {e}")
+        if date_display is not None:
+            # 년월일까지만 표시
+            edit_data = edit_data.assign(날짜=date_display)
         
         # 세션 상태에 저장
         st.session_state.edit_data = edit_data
@@ -781,19 +1053,49 @@ with tab2:
         # 세션 상태에서 편집용 데이터 가져오기
         edit_data = st.session_state.edit_data
     
+    # 직전 백그라운드 저장 결과 표시
+    if 'save_result' in st.session_state:
+        save_success, save_message = st.session_state.pop('save_result')
+        if save_success:
+            st.success(save_message)
+        else:
+            st.error(save_message)
+            st.info("💡 API 한도 초과로 인한 오류일 수 있습니다. 잠시 후 다시 시도해주세요.")
+    
+    # 진행 중인 백그라운드 저장 상태 확인
+    if 'save_future' in st.session_state:
+        render_save_status()
+    
+    # 행이 많으면 선택한 구간만 편집기에 전달 (브라우저 전송량/메모리 절감)
+    edit_start = 0
+    paginated = len(edit_data) > EDITOR_PAGE_ROWS
+    if paginated:
+        edit_start = st.slider(
+            "편집할 시작 행",
+            min_value=0,
+            max_value=len(edit_data) - EDITOR_PAGE_ROWS,
+            value=len(edit_data) - EDITOR_PAGE_ROWS,  # 기본은 최근 구간
+            step=100,
+        )
+        st.caption(f"{edit_start + 1:,}~{edit_start + EDITOR_PAGE_ROWS:,}행 표시 중 (전체 {len(edit_data):,}행). 구간을 바꾸기 전에 변경사항을 적용하세요.")
+    edit_end = edit_start + EDITOR_PAGE_ROWS
+    
     # 편집 가능한 데이터프레임
     edited_data = st.data_editor(
-        edit_data,
+        edit_data.iloc[edit_start:edit_end] if paginated else edit_data,
         num_rows="dynamic",
         use_container_width=True,
-        key="data_editor"
+        key=f"data_editor_{edit_start}" if paginated else "data_editor"
     )
     
     # 변경사항 적용 버튼
-    if st.button("✅ 변경사항 적용", type="primary"):
-        with st.spinner("구글 시트에 저장 중... (변경된 부분만 업데이트)"):
-            # 편집된 데이터를 전역 변수에 반영
-            data = edited_data.copy()
+    if st.button("✅ 변경사항 적용", type="primary", disabled='save_future' in st.session_state):
+        with st.spinner("저장 준비 중..."):
+            # 편집된 데이터를 전역 변수에 반영 (구간 편집이면 앞뒤 구간과 이어 붙임 - 구간 내 행 추가/삭제 포함)
+            if paginated:
+                data = pd.concat([edit_data.iloc[:edit_start], edited_data, edit_data.iloc[edit_end:]], ignore_index=True)
+            else:
+                data = edited_data.copy()
             
             # 날짜 컬럼을 datetime으로 변환 (편집 시 문자열로 표시되었으므로)
             if '날짜' in data.columns:
@@ -805,8 +1107,8 @@ with tab2:
             # 월 컬럼 다시 추가 (내부 계산용)
             if '날짜' in data.columns:
                 try:
-                    # 날짜에서 월 추출하여 월 컬럼 추가
-                    data['월'] = pd.to_datetime(data['날짜']).dt.month
+                    # 날짜에서 월 추출하여 월 컬럼 추가 (위에서 이미 datetime으로 변환됨)
+                    data['월'] = data['날짜'].dt.month
                 except Exception as e:
                     st.warning(f"월 컬럼 계산 중 오류: {e}")
             
@@ -816,30 +1118,23 @@ with tab2:
             if 'edit_data' in st.session_state:
                 del st.session_state.edit_data
             
-            # 원본 데이터 가져오기 (세션에 저장된 원본 데이터)
-            original_data = st.session_state.get('original_data', None)
-            
-            # 구글 시트에 저장 (변경된 부분만 업데이트)
-            success, message = save_data_to_sheet(client, data, sheet_name, sheet_id, original_data)
+            # 원본 데이터 행 해시 가져오기 (세션에 저장된 마지막 동기화 기준)
+            original_hashes = st.session_state.get('original_data_hash', None)
             
-            if success:
-                st.success(message)
-                
-                # 원본 데이터 업데이트 (다음 편집을 위해)
-                st.session_state.original_data = data.copy()
-                
-                # 페이지 새로고침을 위한 세션 상태 업데이트
-                st.session_state.data_updated = True
-                st.rerun()
-            else:
-                st.error("❌ 구글 시트 업데이트에 실패했습니다.")
-                st.info("💡 API 한도 초과로 인한 오류일 수 있습니다. 잠시 후 다시 시도해주세요.")
+            # 구글 시트에 백그라운드로 저장 (변경된 부분만 업데이트)
+            # 이후 rerun에서 data가 제자리 수정되므로 저장용 스냅샷을 넘김
+            data_snapshot = data.copy()
+            st.session_state.save_pending_data = data_snapshot
+            st.session_state.save_future = get_save_executor().submit(
+                save_data_to_sheet, client, data_snapshot, sheet_name, sheet_id, original_hashes
+            )
+            st.info("⏳ 구글 시트 저장을 시작했습니다. 완료되면 결과가 표시됩니다.")
+            render_save_status()
         
         # 업데이트된 데이터 다운로드
-        csv_updated = data.to_csv(index=False)
         st.download_button(
             label="📥 업데이트된 데이터 다운로드",
-            data=csv_updated,
+            data=to_csv_bytes(data),
             file_name="power_data_updated.csv",
             mime="text/csv"
         )
@@ -852,14 +1147,9 @@ with tab2:
             if st.button("📊 엑셀 파일로 저장", type="secondary"):
                 try:
                     # 임시 엑셀 파일 생성
-                    excel_buffer = io.BytesIO()
-                    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                        data.to_excel(writer, index=False, sheet_name='Power_Data')
-                    
-                    excel_buffer.seek(0)
                     st.download_button(
                         label="📥 엑셀 파일 다운로드",
-                        data=excel_buffer.getvalue(),
+                        data=to_excel_bytes(data),
                         file_name="power_data_updated.xlsx",
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                     )
@@ -877,26 +1167,25 @@ with tab2:
 with tab3:
     st.subheader("데이터 통계 정보")
     
+    # 통계 계산 (캐시)
+    numeric_stats, categorical_counts, missing_data = compute_data_stats(data)
+    
     # 수치형 데이터 통계
-    numeric_cols = data.select_dtypes(include=['number']).columns
-    if len(numeric_cols) > 0:
+    if numeric_stats is not None:
         st.write("**수치형 데이터 통계:**")
-        st.dataframe(data[numeric_cols].describe(), use_container_width=True)
+        st.dataframe(numeric_stats, use_container_width=True)
     
     # 범주형 데이터 통계
-    categorical_cols = data.select_dtypes(include=['object']).columns
-    if len(categorical_cols) > 0:
+    if len(categorical_counts) > 0:
         st.write("**범주형 데이터 통계:**")
-        for col in categorical_cols:
+        for col, value_counts in categorical_counts.items():
             st.write(f"**{col}:**")
-            value_counts = data[col].value_counts()
             st.dataframe(value_counts, use_container_width=True)
     
     # 결측값 정보
-    missing_data = data.isnull().sum()
     if missing_data.sum() > 0:
         st.write("**결측값 정보:**")
-        st.dataframe(missing_data[missing_data > 0], use_container_width=True)
+        st.table(missing_data[missing_data > 0])  # 몇 행짜리 정적 요약은 가벼운 HTML 표로
     else:
         st.success("✅ 결측값이 없습니다!")
 
@@ -909,19 +1198,22 @@ with st.expander("📋 Step 1: 데이터 준비", expanded=False):
         pass
     # 날짜 컬럼 변환
     if '날짜' in data.columns:
-        data['날짜'] = pd.to_datetime(data['날짜'])
+        # 로드/편집 반영 시 이미 datetime이면 재변환하지 않음
+        if not pd.api.types.is_datetime64_any_dtype(data['날짜']):
+            data['날짜'] = pd.to_datetime(data['날짜'])
     else:
         st.error("❌ '날짜' 컬럼이 없습니다. 데이터를 확인해주세요.")
         st.stop()
     
     # 요일/평일/공휴일/업무일 파생 (없으면 생성)
     try:
-        weekday_map = {0: '월요일', 1: '화요일', 2: '수요일', 3: '목요일', 4: '금요일', 5: '토요일', 6: '일요일'}
         if '요일' not in data.columns:
-            data['요일'] = data['날짜'].dt.weekday.map(weekday_map)
+            # weekday 코드(int8) 기반 범주형 (결측 날짜는 -1 → NaN)
+            weekday_codes = data['날짜'].dt.weekday.fillna(-1).to_numpy(dtype=np.int8)
+            data['요일'] = pd.Categorical.from_codes(weekday_codes, categories=WEEKDAY_NAMES, ordered=True)
         # 공휴일 플래그 생성 (KR)
         try:
-            kr_holidays = holidays.KR()
+            kr_holidays = get_kr_holidays()
             data['공휴일'] = data['날짜'].dt.date.apply(lambda x: 1 if x in kr_holidays else 0)
         except Exception:
             data['공휴일'] = 0
@@ -949,14 +1241,14 @@ with st.expander("📋 Step 1: 데이터 준비", expanded=False):
                 'weekend': '휴일',
             }
             normalized = weekday_holiday_raw.map(normalization_map).fillna(weekday_holiday_raw)
-            # 최종적으로 '평일' 또는 '휴일' 두 값만 유지, 이외는 요일로 보정
-            mask_unexpected = ~normalized.isin(['평일', '휴일'])
+            # 최종적으로 '평일' 또는 '휴일' 두 값만 유지, 이외는 요일로 보정 (전체 배열에서 한 번에 계산)
+            mask_unexpected = ~normalized.isin(['평일', '휴일']).to_numpy()
+            normalized_arr = normalized.to_numpy(dtype=object, copy=True)
             if mask_unexpected.any():
-                normalized.loc[mask_unexpected] = np.where(
-                    ((data.loc[mask_unexpected, '날짜'].dt.weekday < 5) & (data.loc[mask_unexpected, '공휴일'] == 0)),
-                    '평일', '휴일'
-                )
-            data['평일'] = normalized
+                is_business = (data['날짜'].dt.weekday.to_numpy() < 5) & (data['공휴일'].to_numpy() == 0)
+                fallback = np.where(is_business, '평일', '휴일')
+                normalized_arr[mask_unexpected] = fallback[mask_unexpected]
+            data['평일'] = normalized_arr
     except Exception:
         pass
     
@@ -995,9 +1287,9 @@ with st.expander("📋 Step 1: 데이터 준비", expanded=False):
     with col1:
         st.metric("총 데이터 수", f"{len(data):,}개")
     with col2:
-        st.metric("시작일", data['날짜'].min().strftime('%Y-%m-%d'))
+        st.metric("시작일", start_date)
     with col3:
-        st.metric("종료일", data['날짜'].max().strftime('%Y-%m-%d'))
+        st.metric("종료일", end_date)
 
 st.markdown("---")
 
@@ -1011,21 +1303,8 @@ with st.expander("🔧 Step 2: 특징 공학 및 데이터 정제", expanded=Fal
     data['연도'] = data['날짜'].dt.year
     # 공휴일 플래그는 사용하지 않음 (평일 컬럼 '평일/휴일'에 통합)
     
-    # 요일 더미 생성(모든 요일 포함)
-    data_processed = pd.get_dummies(data, columns=['요일'], drop_first=False)
-    try:
-        # 공휴일 플래그도 보존(모델 입력 여부는 features_max 구성에 따름)
-        data_processed['공휴일'] = data.get('공휴일', 0)
-        # 업무일은 이미 data에 생성되어 있음
-        if '업무일' in data.columns:
-            data_processed['업무일'] = data['업무일'].astype(int)
-    except Exception:
-        pass
-    # 어제 수요 래그 (t-1)
-    try:
-        data_processed['어제의_최대수요'] = pd.to_numeric(data_processed['최대수요'], errors='coerce').shift(1)
-    except Exception:
-        data_processed['어제의_최대수요'] = 0.0
+    # 요일 더미/정렬/어제 래그 (데이터가 바뀌지 않은 재실행에서는 캐시 재사용)
+    data_processed, weekday_dummy_cols = build_processed_base(data)
     
     # 계절별 온도 특징 생성 (유연하게 처리)
     try:
@@ -1044,70 +1323,40 @@ with st.expander("🔧 Step 2: 특징 공학 및 데이터 정제", expanded=Fal
         else:
             st.error("❌ 온도 관련 컬럼이 부족합니다. 최소한 최고기온 또는 체감온도가 필요합니다.")
             st.stop()
-        data_processed['냉방강도'] = (pd.to_numeric(temp_for_cooling, errors='coerce') - cooling_base_temp).clip(lower=0)
-        
         # 난방강도: 최저기온 기준으로 계산
         if '최저기온' in data_processed.columns:
-            temp_for_heating = pd.to_numeric(data_processed['최저기온'], errors='coerce')
-            data_processed['난방강도'] = (heating_base_temp - temp_for_heating).clip(lower=0)
+            temp_min_arr = pd.to_numeric(data_processed['최저기온'], errors='coerce').to_numpy(dtype=float)
         else:
             st.warning("⚠️ 최저기온이 없어 난방강도는 0으로 대체됩니다.")
-            data_processed['난방강도'] = 0.0
-        st.success("✅ 냉방/난방 강도를 반영한 계절별 온도 특징 생성 완료!")
-        # 계절 마스크 적용: 여름엔 냉방강도만, 겨울엔 난방강도만 사용
-        data_processed['냉방강도'] = data_processed['냉방강도'] * is_summer_mask.astype(int)
-        data_processed['난방강도'] = data_processed['난방강도'] * is_winter_mask.astype(int)
-
+            temp_min_arr = None
         # 추가 온도 파생: 일교차(최고-최저) (가능할 때)
-        try:
-            if '최고기온' in data_processed.columns and '최저기온' in data_processed.columns:
-                data_processed['일교차'] = pd.to_numeric(data_processed['최고기온'], errors='coerce') - pd.to_numeric(data_processed['최저기온'], errors='coerce')
-        except Exception:
-            pass
+        temp_max_arr = pd.to_numeric(data_processed['최고기온'], errors='coerce').to_numpy(dtype=float) if '최고기온' in data_processed.columns else None
+
+        # 냉방/난방 강도(계절 마스크 포함)와 일교차를 한 번에 계산
+        cooling_arr, heating_arr, diurnal_arr = compute_temp_features(
+            pd.to_numeric(temp_for_cooling, errors='coerce').to_numpy(dtype=float),
+            temp_min_arr,
+            temp_max_arr,
+            is_summer_mask.to_numpy(),
+            is_winter_mask.to_numpy(),
+            cooling_base_temp=cooling_base_temp,
+            heating_base_temp=heating_base_temp,
+        )
+        data_processed['냉방강도'] = cooling_arr
+        data_processed['난방강도'] = heating_arr
+        if diurnal_arr is not None:
+            data_processed['일교차'] = diurnal_arr
+        st.success("✅ 냉방/난방 강도를 반영한 계절별 온도 특징 생성 완료!")
 
         # 이동평균(누수 방지: shift(1) 후 rolling)
         try:
             # 7일평균 제거 요청으로 생성하지 않음
             data_processed['전주동일요일_최대수요'] = data_processed['최대수요'].shift(7)
-            # 작년 동일월의 같은 요일 평균만 사용하여 작년동일요일_최대수요 생성
-            try:
-                # 먼저 (전년도) 월×요일 평균 맵을 준비했다고 가정하고, 없으면 지금 생성
-                ly_map = st.session_state.get('last_year_month_weekday_mean_max')
-                if not ly_map:
-                    if '연도' in data_processed.columns and '월' in data_processed.columns and '요일' in data_processed.columns:
-                        max_year = int(pd.to_numeric(data_processed['연도'], errors='coerce').dropna().max())
-                        target_year = max_year - 1
-                        df_prev_year = data_processed[pd.to_numeric(data_processed['연도'], errors='coerce') == target_year]
-                        if len(df_prev_year) == 0:
-                            df_prev_year = data_processed
-                        grp = df_prev_year.groupby(['월', '요일'])['최대수요'].mean().reset_index()
-                        ly_map = {(int(r['월']), str(r['요일'])): float(r['최대수요']) for _, r in grp.iterrows()}
-                        st.session_state.last_year_month_weekday_mean_max = ly_map
-                    else:
-                        ly_map = {}
-
-                if ly_map and '월' in data_processed.columns and '요일' in data_processed.columns:
-                    data_processed['작년동일요일_최대수요'] = [
-                        float(ly_map.get((int(m), str(w)), 0.0)) for m, w in zip(data_processed['월'], data_processed['요일'])
-                    ]
-                else:
-                    data_processed['작년동일요일_최대수요'] = 0.0
-            except Exception:
-                data_processed['작년동일요일_최대수요'] = 0.0
-            # 작년 월-요일 평균 맵(예측 시 사용할 백업)
-            try:
-                # 가장 최근 연도의 직전 연도 기준으로 평균 생성
-                if '연도' in data_processed.columns and '월' in data_processed.columns and '요일' in data_processed.columns:
-                    max_year = int(pd.to_numeric(data_processed['연도'], errors='coerce').dropna().max())
-                    target_year = max_year - 1
-                    df_prev_year = data_processed[pd.to_numeric(data_processed['연도'], errors='coerce') == target_year]
-                    if len(df_prev_year) == 0:
-                        df_prev_year = data_processed
-                    grp = df_prev_year.groupby(['월', '요일'])['최대수요'].mean().reset_index()
-                    ly_mw_map = {(int(r['월']), str(r['요일'])): float(r['최대수요']) for _, r in grp.iterrows()}
-                    st.session_state.last_year_month_weekday_mean_max = ly_mw_map
-            except Exception:
-                st.session_state.last_year_month_weekday_mean_max = {}
+            # 작년동일요일_최대수요는 기존과 같이 비활성(0)으로 유지
+            # (최근 연도의 직전 연도 월×요일 평균을 모든 행에 붙이면 그 연도 행에는 자기 목표값이 섞여 누수되므로,
+            #  행마다 해당 행 기준 직전 연도만 조회하는 방식과 정확도 비교 없이 활성화하지 않음)
+            data_processed['작년동일요일_최대수요'] = 0.0
+            st.session_state.last_year_month_weekday_mean_max = np.zeros((13, 7), dtype=np.float64)
         except Exception:
             pass
 
@@ -1155,11 +1404,13 @@ with st.expander("🔧 Step 2: 특징 공학 및 데이터 정제", expanded=Fal
             if '업무일' in data_processed.columns:
                 is_weekday_series = data_processed['업무일']
             else:
-                is_weekday_series = ((data['날짜'].dt.weekday < 5) & (~data['날짜'].dt.date.isin(holidays.KR()))).astype(int)
+                is_weekday_series = ((data_processed['날짜'].dt.weekday < 5) & (~data_processed['날짜'].dt.date.isin(get_kr_holidays()))).astype(int)
 
-            weekday_mean = total_ratio[is_weekday_series == 1].mean()
-            weekend_mean = total_ratio[is_weekday_series == 0].mean()
+            # 평일/주말 평균을 한 번의 groupby로 계산 (없는 그룹은 전체 평균으로 대체)
+            ratio_means = total_ratio.groupby(is_weekday_series.astype(np.int8)).mean()
             global_mean = total_ratio.mean()
+            weekday_mean = ratio_means.get(1, global_mean)
+            weekend_mean = ratio_means.get(0, global_mean)
 
             if pd.isna(weekday_mean):
                 weekday_mean = global_mean
@@ -1171,7 +1422,7 @@ with st.expander("🔧 Step 2: 특징 공학 및 데이터 정제", expanded=Fal
             st.session_state.gas_total_ratio_weekend = float(weekend_mean) if not pd.isna(weekend_mean) else 0.0
 
             # 행별 예산 비율 선택 후 목표 가스량 계산: max*ratio - solar
-            ratio_used = np.where(is_weekday_series == 1, st.session_state.gas_total_ratio_weekday, st.session_state.gas_total_ratio_weekend)
+            ratio_used = np.where(is_weekday_series.to_numpy() == 1, st.session_state.gas_total_ratio_weekday, st.session_state.gas_total_ratio_weekend)
             data_processed['목표가스_예산'] = (data_processed['최대수요'] * ratio_used - data_processed['태양광최대']).clip(lower=0)
         except Exception:
             # 실패 시 컬럼 미생성
@@ -1231,8 +1482,8 @@ with st.expander("🎯 Step 3: 모델 변수 및 데이터 분리", expanded=Fal
     # 추가로 최저/최고/체감/일교차까지 함께 사용 (존재하는 경우만)
     _temp_extras = [f for f in ['최고기온', '최저기온', '체감온도', '일교차'] if f in data_processed.columns]
 
-    # 요일 더미 포함 (평일_평일 제거)
-    _dummies = [col for col in data_processed if col.startswith('요일_')]
+    # 요일 더미 포함 (평일_평일 제거) - 캐시된 기본 프레임 생성 시 스캔한 목록을 아래 표시/안내에서도 재사용
+    _dummies = weekday_dummy_cols
 
     features_max = _base_max + _temp_extras + _dummies
 
@@ -1246,15 +1497,19 @@ with st.expander("🎯 Step 3: 모델 변수 및 데이터 분리", expanded=Fal
         if temp_col in data_processed.columns:
             data_processed[temp_col] = pd.to_numeric(data_processed[temp_col], errors='coerce')
 
-    X_max = data_processed[features_max].copy()
+    X_max = data_processed[features_max]
     y_max = pd.to_numeric(data_processed['최대수요'], errors='coerce')
+    # 분할용 날짜 배열 (data_processed와 같은 행 순서, 한 번만 추출해 각 분할에서 재사용)
+    dates_processed = data_processed['날짜'].to_numpy(dtype='datetime64[ns]')
 
 # X, y 동시 결측 제거(필요 최소 범위)
     valid_mask = ~y_max.isna()
     for c in X_max.columns:
         valid_mask &= ~X_max[c].isna()
-    X_max = X_max[valid_mask]
+    # 트리 학습기가 내부적으로 쓰는 float32로 한 번만 변환 (bool 더미 포함, 컬럼명은 유지)
+    X_max = X_max[valid_mask].astype(np.float32)
     y_max = y_max[valid_mask]
+    dates_max = dates_processed[valid_mask.to_numpy()]
 
 # 최저수요 모델 제거 - 최대수요 모델만 사용
 
@@ -1265,7 +1520,7 @@ with st.expander("🎯 Step 3: 모델 변수 및 데이터 분리", expanded=Fal
 
 # 단일 모델용 데이터 분할 - 시간순 분할 (평일/주말 분리 제거)
     X_max_train, X_max_test, y_max_train, y_max_test = chronological_split(
-        X_max, y_max, pd.to_datetime(data.loc[X_max.index, '날짜'], errors='coerce'), test_size=test_size
+        X_max, y_max, dates_max, test_size=test_size
     )
 
 # 변수 정보 표시
@@ -1282,21 +1537,18 @@ with st.expander("🎯 Step 3: 모델 변수 및 데이터 분리", expanded=Fal
         '요일_월요일', '요일_화요일', '요일_수요일', '요일_목요일',
         '요일_금요일', '요일_토요일', '요일_일요일'
     ]
-    weekday_cols_present = [c for c in features_max if c.startswith('요일_')]
-    weekday_cols_ordered = [c for c in weekday_display_order if c in weekday_cols_present]
-    non_weekday_cols = [c for c in features_max if not c.startswith('요일_')]
+    weekday_cols_ordered = [c for c in weekday_display_order if c in weekday_dummy_cols]
+    non_weekday_cols = _base_max + _temp_extras
     features_max_display_ordered = non_weekday_cols + weekday_cols_ordered
 
     display_features_max = [_display_name_map.get(name, name) for name in features_max_display_ordered]
     # 헤더 행을 사용한 한 줄 표
     max_vars_df = pd.DataFrame([display_features_max], columns=[f'변수{i+1}' for i in range(len(display_features_max))])
-    st.dataframe(max_vars_df, use_container_width=True)
+    st.table(max_vars_df)  # 한 줄짜리 정적 표는 데이터 그리드 대신 HTML 표로 렌더링
 
     # 요일 더미 기준 범주 안내 (drop_first=True로 인해 표에서 빠진 요일)
     try:
-        existing_weekday_dummy_cols = [c for c in data_processed.columns if c.startswith('요일_')]
-        all_weekdays = ['월요일','화요일','수요일','목요일','금요일','토요일','일요일']
-        baseline_weekdays = [d for d in all_weekdays if f'요일_{d}' not in existing_weekday_dummy_cols]
+        baseline_weekdays = [d for d in WEEKDAY_NAMES if f'요일_{d}' not in weekday_dummy_cols]
         if len(baseline_weekdays) > 0:
             st.caption(f"요일 원-핫은 다중공선성 방지를 위해 기준 범주가 1개 빠집니다 (기준: {', '.join(baseline_weekdays)}). 모델에는 기준 요일도 정상 반영됩니다.")
     except Exception:
@@ -1326,23 +1578,22 @@ with st.expander("🎯 Step 3: 모델 변수 및 데이터 분리", expanded=Fal
             y_gas = data_processed['가스수요']
         
         # 가스수요 데이터 분할 - 시간순 분할 (태양광최대는 2024-12-01 이후 데이터만 학습 사용)
+            gas_dates = dates_processed
             try:
-                gas_date_series = pd.to_datetime(data_processed.loc[X_gas.index, '날짜'], errors='coerce')
-                cutoff = pd.Timestamp('2024-12-01')
-                mask_after_cutoff = gas_date_series >= cutoff
+                mask_after_cutoff = gas_dates >= np.datetime64('2024-12-01')
                 X_gas = X_gas[mask_after_cutoff]
                 y_gas = y_gas[mask_after_cutoff]
-                gas_date_series = gas_date_series[mask_after_cutoff]
+                gas_dates = gas_dates[mask_after_cutoff]
             except Exception:
                 pass
 
             X_gas_train, X_gas_test, y_gas_train, y_gas_test = chronological_split(
-                X_gas, y_gas, gas_date_series if 'gas_date_series' in locals() else data_processed.loc[X_gas.index, '날짜'], test_size=test_size
+                X_gas, y_gas, gas_dates, test_size=test_size
             )
         
             st.write(f"특징 변수: {len(available_gas_features)}개")
             gas_vars_df = pd.DataFrame([available_gas_features], columns=[f'변수{i+1}' for i in range(len(available_gas_features))])
-            st.dataframe(gas_vars_df, use_container_width=True)
+            st.table(gas_vars_df)
         
         # 세션 상태에 저장 (단일 전체 세트)
         st.session_state.X_gas_train = X_gas_train
@@ -1359,44 +1610,14 @@ with st.expander("🎯 Step 3: 모델 변수 및 데이터 분리", expanded=Fal
                 mask_weekday = pd.Series(False, index=data_processed.index)
         else:
             # 원본 '평일'에서 유도
-            mask_weekday = (data['평일'] == '평일') if '평일' in data.columns else pd.Series(False, index=data_processed.index)
+            mask_weekday = (data_processed['평일'] == '평일') if '평일' in data_processed.columns else pd.Series(False, index=data_processed.index)
 
         try:
-            X_gas_wd = X_gas[mask_weekday]
-            y_gas_wd = y_gas[mask_weekday]
-            X_gas_we = X_gas[~mask_weekday]
-            y_gas_we = y_gas[~mask_weekday]
-
-            # 평일/주말 분리 세트에도 동일 컷오프 적용
-            try:
-                gas_dates_all = pd.to_datetime(data_processed.loc[X_gas.index, '날짜'], errors='coerce')
-                cutoff = pd.Timestamp('2024-12-01')
-                mask_after = gas_dates_all >= cutoff
-                # 재적용
-                X_gas_wd, y_gas_wd = X_gas_wd[mask_after.loc[X_gas_wd.index]], y_gas_wd[mask_after.loc[X_gas_wd.index]]
-                X_gas_we, y_gas_we = X_gas_we[mask_after.loc[X_gas_we.index]], y_gas_we[mask_after.loc[X_gas_we.index]]
-            except Exception:
-                pass
-
-            # 최소 표본 확인 후 분할
-            if len(X_gas_wd) >= 20 and len(X_gas_we) >= 20:
-                X_gas_wd_tr, X_gas_wd_te, y_gas_wd_tr, y_gas_wd_te = chronological_split(
-                    X_gas_wd, y_gas_wd, data_processed.loc[X_gas_wd.index, '날짜'], test_size=test_size
-                )
-                X_gas_we_tr, X_gas_we_te, y_gas_we_tr, y_gas_we_te = chronological_split(
-                    X_gas_we, y_gas_we, data_processed.loc[X_gas_we.index, '날짜'], test_size=test_size
-                )
-
-                st.session_state.X_gas_train_weekday = X_gas_wd_tr
-                st.session_state.X_gas_test_weekday = X_gas_wd_te
-                st.session_state.y_gas_train_weekday = y_gas_wd_tr
-                st.session_state.y_gas_test_weekday = y_gas_wd_te
-
-                st.session_state.X_gas_train_weekend = X_gas_we_tr
-                st.session_state.X_gas_test_weekend = X_gas_we_te
-                st.session_state.y_gas_train_weekend = y_gas_we_tr
-                st.session_state.y_gas_test_weekend = y_gas_we_te
-            else:
+            # X_gas는 이미 컷오프가 적용된 세트이므로 같은 행에 맞춘 마스크로만 분리
+            mask_weekday_gas = mask_weekday.loc[X_gas.index].to_numpy(dtype=bool)
+            # 최소 표본 확인 (단일 모델만 학습하므로 평일/주말 분할 세트는 세션에 따로 보관하지 않음)
+            n_gas_weekday = int(mask_weekday_gas.sum())
+            if n_gas_weekday < 20 or len(mask_weekday_gas) - n_gas_weekday < 20:
                 st.warning("⚠️ 평일/주말 분리 학습을 위한 표본 수가 부족합니다. 단일 모델로 학습합니다.")
         except Exception:
                 st.warning("⚠️ 평일/주말 분리 데이터 생성 중 오류가 발생하여 단일 모델로 진행합니다.")
@@ -1425,6 +1646,17 @@ with st.expander("🤖 Step 4: 모델 학습", expanded=False):
         rf_max = tune_rf_model(X_max_train, y_max_train, random_state=random_state)
     except Exception:
         rf_max = train_rf_model(X_max_train, y_max_train, n_estimators=n_estimators, random_state=random_state)
+    # 날짜 기반 단일 행 예측용 (검증 생략 경로) - 캐시된 같은 모델이면 변환 결과 재사용
+    # (입력 행의 컬럼 위치 맵도 모델 단위로 한 번만 구성)
+    if st.session_state.get('rf_max_predict_model') is not rf_max:
+        feature_idx = {name: i for i, name in enumerate(getattr(rf_max, 'feature_names_in_', features_max))}
+        st.session_state.rf_max_predict_model = rf_max
+        st.session_state.rf_max_predict_one = make_fast_predict(rf_max)
+        st.session_state.rf_max_feature_idx = feature_idx
+        st.session_state.rf_max_weekday_idx = [feature_idx.get(f'요일_{w}') for w in WEEKDAY_NAMES]
+    rf_max_predict_one = st.session_state.rf_max_predict_one
+    rf_max_feature_idx = st.session_state.rf_max_feature_idx
+    rf_max_weekday_idx = st.session_state.rf_max_weekday_idx
     
     # 가스수요 모델 학습 (단일 모델로 고정)
     if hasattr(st.session_state, 'features_gas'):
@@ -1453,6 +1685,8 @@ with st.expander("🤖 Step 4: 모델 학습", expanded=False):
             min_child_samples=10,
             random_state=random_state,
         )
+        st.session_state.gas_predict_one = make_fast_predict(st.session_state.gas_model)
+        st.session_state.gas_feature_idx = {f: i for i, f in enumerate(st.session_state.features_gas)}
         st.success("✅ 전력수요 및 가스수요 모델 학습 완료! (단일)")
     else:
         st.success("✅ 전력수요 모델 학습 완료!")
@@ -1463,15 +1697,28 @@ st.markdown("---")
 with st.expander("📊 Step 5: 모델 성능 평가", expanded=False):
     with st.spinner("성능을 평가 중..."):
         st.subheader("📈 단일 모델 성능 (검증 세트)")
-        y_pred = rf_max.predict(X_max_test)
-        st.session_state.mae_max = mean_absolute_error(y_max_test, y_pred)
-        st.session_state.r2_max = r2_score(y_max_test, y_pred)
-    
-    # 가스수요 단일 모델 성능 평가
-        if hasattr(st.session_state, 'gas_model') and hasattr(st.session_state, 'X_gas_test'):
-            y_gas_pred = st.session_state.gas_model.predict(st.session_state.X_gas_test)
-            st.session_state.mae_gas = mean_absolute_error(st.session_state.y_gas_test, y_gas_pred)
-            st.session_state.r2_gas = r2_score(st.session_state.y_gas_test, y_gas_pred)
+        # 모델 객체와 검증 세트 지문이 모두 같을 때만 이전 평가 결과 재사용
+        # (시간순 분할이라 최근 행만 편집하면 학습 세트/캐시 모델은 그대로여도 검증 세트는 바뀜)
+        from sklearn.metrics import mean_absolute_error, r2_score
+        max_eval_key = eval_data_fingerprint(X_max_test, y_max_test)
+        prev_max_eval = st.session_state.get('eval_max', (None, None))
+        if prev_max_eval[0] is not rf_max or prev_max_eval[1] != max_eval_key:
+            y_pred = rf_max.predict(X_max_test)
+            # 세션에는 스칼라만 보관 (예측 배열은 지역 변수로 버림)
+            st.session_state.mae_max = float(mean_absolute_error(y_max_test, y_pred))
+            st.session_state.r2_max = float(r2_score(y_max_test, y_pred))
+            st.session_state.eval_max = (rf_max, max_eval_key)
+
+        # 가스수요 단일 모델 성능 평가
+        gas_model_for_eval = st.session_state.get('gas_model') if hasattr(st.session_state, 'X_gas_test') else None
+        if gas_model_for_eval is not None:
+            gas_eval_key = eval_data_fingerprint(st.session_state.X_gas_test, st.session_state.y_gas_test)
+            prev_gas_eval = st.session_state.get('eval_gas', (None, None))
+            if prev_gas_eval[0] is not gas_model_for_eval or prev_gas_eval[1] != gas_eval_key:
+                y_gas_pred = gas_model_for_eval.predict(st.session_state.X_gas_test)
+                st.session_state.mae_gas = float(mean_absolute_error(st.session_state.y_gas_test, y_gas_pred))
+                st.session_state.r2_gas = float(r2_score(st.session_state.y_gas_test, y_gas_pred))
+                st.session_state.eval_gas = (gas_model_for_eval, gas_eval_key)
 
         # 성능 결과 표시 (최대수요 / 가스수요 나란히)
         if hasattr(st.session_state, 'mae_gas') and hasattr(st.session_state, 'r2_gas'):
@@ -1517,366 +1764,361 @@ st.info(
     "요일은 원-핫, 업무일은 공휴일을 고려한 평일 플래그로 반영됩니다."
 )
 
-with st.form("date_based_forecast_form"):
-    # 기본 날짜: 데이터 마지막 날짜 다음날, 없으면 오늘
-    try:
-        latest_ts = pd.to_datetime(data['날짜'], errors='coerce').dropna().max()
-        default_target_date = (latest_ts + pd.Timedelta(days=1)).date()
-    except Exception:
-        default_target_date = pd.Timestamp.today().date()
-
-    target_date = st.date_input("예측 날짜 선택", value=default_target_date, key="target_date_input")
-
-    # 온도 입력(시트에 없을 경우 사용)
-    colA, colB, colC = st.columns(3)
-    with colA:
-        min_temp_input = st.number_input("최저기온 (°C) [옵션]", min_value=-50.0, max_value=50.0, value=0.0, step=0.1, key="date_min_temp")
-    with colB:
-        max_temp_input = st.number_input("최고기온 (°C) [옵션]", min_value=-50.0, max_value=50.0, value=0.0, step=0.1, key="date_max_temp")
-    with colC:
-        feels_like_input = st.number_input("체감온도 (°C) [옵션]", min_value=-50.0, max_value=50.0, value=0.0, step=0.1, key="date_feels_like")
+# 날짜 기반 예측 패널 (폼 제출 시 전체 스크립트가 아닌 이 패널만 재실행)
+@st.fragment
+def render_date_forecast_panel():
+    with st.form("date_based_forecast_form"):
+        # 기본 날짜: 데이터 마지막 날짜 다음날, 없으면 오늘
+        try:
+            latest_ts = data['날짜'].dropna().max()
+            default_target_date = (latest_ts + pd.Timedelta(days=1)).date()
+        except Exception:
+            default_target_date = pd.Timestamp.today().date()
 
-    submit_date_forecast = st.form_submit_button("🔮 날짜 기반 예측 실행")
+        target_date = st.date_input("예측 날짜 선택", value=default_target_date, key="target_date_input")
 
-if submit_date_forecast:
-    try:
-        with st.spinner("날짜 기반 예측을 수행 중..."):
-            target_ts = pd.to_datetime(target_date)
-            weekday_map = {0: '월요일', 1: '화요일', 2: '수요일', 3: '목요일', 4: '금요일', 5: '토요일', 6: '일요일'}
-            weekday_name = weekday_map.get(int(target_ts.weekday()))
-            month_val = int(target_ts.month)
-
-            # 시즌 판별
-            is_summer = month_val in [5, 6, 7, 8, 9]
-            is_winter = month_val in [10, 11, 12, 1, 2, 3, 4]
-
-            # 시트 기반 온도값 조회(있으면 우선 사용)
-            min_temp_val = None
-            max_temp_val = None
-            feels_like_val = None
-            try:
-                if '날짜' in data.columns:
-                    df_sorted = data.copy()
-                    df_sorted['날짜'] = pd.to_datetime(df_sorted['날짜'], errors='coerce')
-                    row_today = df_sorted[df_sorted['날짜'].dt.date == target_ts.date()]
-                    if not row_today.empty:
-                        if '최저기온' in row_today.columns:
-                            min_temp_val = pd.to_numeric(row_today['최저기온'], errors='coerce').iloc[0]
-                        if '최고기온' in row_today.columns:
-                            max_temp_val = pd.to_numeric(row_today['최고기온'], errors='coerce').iloc[0]
-                        if '체감온도' in row_today.columns:
-                            feels_like_val = pd.to_numeric(row_today['체감온도'], errors='coerce').iloc[0]
-            except Exception:
-                pass
+        # 온도 입력(시트에 없을 경우 사용)
+        colA, colB, colC = st.columns(3)
+        with colA:
+            min_temp_input = st.number_input("최저기온 (°C) [옵션]", min_value=-50.0, max_value=50.0, value=0.0, step=0.1, key="date_min_temp")
+        with colB:
+            max_temp_input = st.number_input("최고기온 (°C) [옵션]", min_value=-50.0, max_value=50.0, value=0.0, step=0.1, key="date_max_temp")
+        with colC:
+            feels_like_input = st.number_input("체감온도 (°C) [옵션]", min_value=-50.0, max_value=50.0, value=0.0, step=0.1, key="date_feels_like")
 
-            # 입력값으로 보완
-            if pd.isna(min_temp_val) if min_temp_val is not None else True:
-                min_temp_val = None if not is_winter else float(min_temp_input)
-            if pd.isna(max_temp_val) if max_temp_val is not None else True:
-                max_temp_val = None if not is_summer else float(max_temp_input)
-            if pd.isna(feels_like_val) if feels_like_val is not None else True:
-                feels_like_val = float(feels_like_input) if feels_like_input is not None else None
-            if feels_like_val is None:
-                # 대용: 여름엔 최고기온, 겨울엔 최저기온, 이외 평균 대용
-                if is_summer and max_temp_val is not None:
-                    feels_like_val = float(max_temp_val)
-                elif is_winter and min_temp_val is not None:
-                    feels_like_val = float(min_temp_val)
-                else:
-                    feels_like_val = float((min_temp_val or 0.0 + max_temp_val or 0.0) / 2.0)
-
-            # 공휴일/업무일/평일 플래그 산출 (한국 공휴일 기준)
-            try:
-                kr_holidays = holidays.KR()
-            except Exception:
-                kr_holidays = {}
-            weekday_num = int(target_ts.weekday())
-            is_holiday_flag = 1 if target_ts.date() in kr_holidays else 0
-            is_business_day_flag = 1 if (weekday_num < 5 and is_holiday_flag == 0) else 0
-            # 기존 시트의 '평일' 값이 있다면 보정(단, 공휴일이면 우선적으로 휴일 처리)
-            try:
-                if '평일' in data.columns:
-                    row_today = data[pd.to_datetime(data['날짜'], errors='coerce').dt.date == target_ts.date()]
-                    if not row_today.empty:
-                        sheet_weekday = 1 if str(row_today['평일'].iloc[0]) == '평일' else 0
-                        if is_holiday_flag == 1:
-                            is_business_day_flag = 0
-                        else:
-                            is_business_day_flag = sheet_weekday
-            except Exception:
-                pass
-            # 모델 입력용 단순 플래그 (평일_평일 제거에 따라 더미에서만 사용)
-            is_weekday_flag = is_business_day_flag
+        submit_date_forecast = st.form_submit_button("🔮 날짜 기반 예측 실행")
 
-            # 래그 계산: 과거 관측에서 추출
-            y_series = None
-            try:
-                dfp = data_processed.copy()
-                dfp['날짜'] = pd.to_datetime(dfp['날짜'], errors='coerce')
-                dfp = dfp.sort_values('날짜')
-                past = dfp[dfp['날짜'] < target_ts]
-                y_series = pd.to_numeric(past['최대수요'], errors='coerce').dropna()
-            except Exception:
-                y_series = pd.Series(dtype=float)
+    if submit_date_forecast:
+        try:
+            with st.spinner("날짜 기반 예측을 수행 중..."):
+                target_ts = pd.to_datetime(target_date)
+                month_val = int(target_ts.month)
+
+                # 시즌 판별
+                is_summer = month_val in [5, 6, 7, 8, 9]
+                is_winter = month_val in [10, 11, 12, 1, 2, 3, 4]
+
+                # 시트 기반 온도값 조회(있으면 우선 사용)
+                min_temp_val = None
+                max_temp_val = None
+                feels_like_val = None
+                data_by_date = build_date_index(data)
+                row_today = data_by_date.loc[[target_ts.date()]] if target_ts.date() in data_by_date.index else data_by_date.iloc[0:0]
+                try:
+                    if '날짜' in data.columns:
+                        if not row_today.empty:
+                            if '최저기온' in row_today.columns:
+                                min_temp_val = row_today['최저기온'].iat[0]
+                            if '최고기온' in row_today.columns:
+                                max_temp_val = row_today['최고기온'].iat[0]
+                            if '체감온도' in row_today.columns:
+                                feels_like_val = row_today['체감온도'].iat[0]
+                except Exception:
+                    pass
+
+                # 입력값으로 보완
+                if is_missing(min_temp_val):
+                    min_temp_val = None if not is_winter else float(min_temp_input)
+                if is_missing(max_temp_val):
+                    max_temp_val = None if not is_summer else float(max_temp_input)
+                if is_missing(feels_like_val):
+                    feels_like_val = float(feels_like_input) if feels_like_input is not None else None
+                if feels_like_val is None:
+                    # 대용: 여름엔 최고기온, 겨울엔 최저기온, 이외 평균 대용
+                    if is_summer and max_temp_val is not None:
+                        feels_like_val = float(max_temp_val)
+                    elif is_winter and min_temp_val is not None:
+                        feels_like_val = float(min_temp_val)
+                    else:
+                        # 있는 값만으로 평균 (둘 다 없으면 0)
+                        available_temps = [float(v) for v in (min_temp_val, max_temp_val) if v is not None]
+                        feels_like_val = sum(available_temps) / len(available_temps) if available_temps else 0.0
+
+                # 결측 보완을 반영한 최고/최저기온을 한 번만 확정해 피처 계산에 재사용
+                hi_temp = feels_like_val if max_temp_val is None else float(max_temp_val)
+                lo_temp = feels_like_val if min_temp_val is None else float(min_temp_val)
+                diurnal_range = (hi_temp - lo_temp) if (max_temp_val is not None and min_temp_val is not None) else 0.0
+
+                # 공휴일/업무일/평일 플래그 산출 (한국 공휴일 기준)
+                kr_holidays = get_kr_holidays()
+                weekday_num = int(target_ts.weekday())
+                is_holiday_flag = 1 if target_ts.date() in kr_holidays else 0
+                is_business_day_flag = 1 if (weekday_num < 5 and is_holiday_flag == 0) else 0
+                # 기존 시트의 '평일' 값이 있다면 보정(단, 공휴일이면 우선적으로 휴일 처리)
+                try:
+                    if '_is_weekday_sheet' in row_today.columns:
+                        if not row_today.empty:
+                            sheet_weekday = int(row_today['_is_weekday_sheet'].iat[0])
+                            if is_holiday_flag == 1:
+                                is_business_day_flag = 0
+                            else:
+                                is_business_day_flag = sheet_weekday
+                except Exception:
+                    pass
+                # 모델 입력용 단순 플래그 (평일_평일 제거에 따라 더미에서만 사용)
+                is_weekday_flag = is_business_day_flag
 
-            # 어제(t-1)
+                # 래그 계산: 과거 관측에서 추출
+                # (정렬된 이력의 날짜 배열에서 이진 탐색)
+                try:
+                    dfp = build_sorted_history(data_processed)
+                    hist_dates_i8 = dfp['날짜'].to_numpy(dtype='datetime64[ns]').view('i8')
+                    hist_max = dfp['최대수요'].to_numpy(dtype=float)
+                    past_end = int(np.searchsorted(hist_dates_i8, target_ts.value, side='left'))
+                    y_past = hist_max[:past_end]
+                    y_past = y_past[~np.isnan(y_past)]
+                except Exception:
+                    hist_dates_i8 = np.empty(0, dtype=np.int64)
+                    hist_max = np.empty(0, dtype=float)
+                    y_past = np.empty(0, dtype=float)
 
-            # 7일 평균 제거 요청으로 미사용
+                # 어제(t-1)
 
-            # 전주 동일 요일(t-7)
-            try:
-                y_t7 = 0.0
-                exact_t7 = dfp[dfp['날짜'] == (target_ts - pd.Timedelta(days=7))]
-                if not exact_t7.empty:
-                    y_t7 = float(pd.to_numeric(exact_t7['최대수요'], errors='coerce').iloc[0])
-                elif len(y_series) >= 7:
-                    y_t7 = float(y_series.iloc[-7])
-            except Exception:
-                y_t7 = 0.0
+                # 7일 평균 제거 요청으로 미사용
 
-            # 작년 동일일
-            try:
-                ly_map = st.session_state.get('last_year_month_weekday_mean_max', {})
-                wd_name = weekday_name
-                ly_val = float(ly_map.get((month_val, wd_name), 0.0)) if ly_map else 0.0
-            except Exception:
-                ly_val = 0.0
-
-            # 피처 구성
-            feature_row = {
-                '냉방강도': max(0.0, (feels_like_val if max_temp_val is None else max_temp_val) - 25.0),
-                '난방강도': max(0.0, 10.0 - (min_temp_val if min_temp_val is not None else feels_like_val)),
-                '월': month_val,
-                '어제의_최대수요': float(y_series.iloc[-1]) if 'y_series' in locals() and len(y_series) > 0 else 0.0,
-                '전주동일요일_최대수요': y_t7,
-                '작년동일요일_최대수요': ly_val,
-                '공휴일': int(is_holiday_flag),
-                '업무일': int(is_business_day_flag),
-                '최고기온': (max_temp_val if max_temp_val is not None else feels_like_val) if is_summer else 0.0,
-                '최저기온': (min_temp_val if min_temp_val is not None else feels_like_val) if is_winter else 0.0,
-                '체감온도': feels_like_val,
-                '일교차': ( (max_temp_val - min_temp_val) if (max_temp_val is not None and min_temp_val is not None) else 0.0 ),
-            }
-            feature_row.update({f'요일_{w}': (1 if w == weekday_name else 0) for w in ['월요일','화요일','수요일','목요일','금요일','토요일','일요일']})
+                # 전주 동일 요일(t-7)
+                try:
+                    y_t7 = 0.0
+                    t7_i8 = (target_ts - pd.Timedelta(days=7)).value
+                    t7_idx = int(np.searchsorted(hist_dates_i8, t7_i8, side='left'))
+                    if t7_idx < len(hist_dates_i8) and hist_dates_i8[t7_idx] == t7_i8:
+                        y_t7 = float(hist_max[t7_idx])
+                    elif len(y_past) >= 7:
+                        y_t7 = float(y_past[-7])
+                except Exception:
+                    y_t7 = 0.0
 
-            model_for_date = rf_max
-            frame = pd.DataFrame([feature_row])
-            frame = align_features_for_model(model_for_date, frame)
-            predicted_by_date = float(model_for_date.predict(frame)[0])
+                # 작년 동일일
+                try:
+                    ly_arr = st.session_state.get('last_year_month_weekday_mean_max')
+                    ly_val = float(ly_arr[month_val, weekday_num]) if ly_arr is not None else 0.0
+                except Exception:
+                    ly_val = 0.0
+
+                # 피처 구성: 학습 컬럼 순서의 입력 행에 직접 기록 (학습 시 없던 컬럼은 건너뛰고, 나머지는 0)
+                date_row = np.zeros(len(rf_max_feature_idx), dtype=np.float32)
+                feature_values = (
+                    ('냉방강도', max(0.0, hi_temp - 25.0)),
+                    ('난방강도', max(0.0, 10.0 - lo_temp)),
+                    ('월', month_val),
+                    ('어제의_최대수요', float(y_past[-1]) if len(y_past) > 0 else 0.0),
+                    ('전주동일요일_최대수요', y_t7),
+                    ('작년동일요일_최대수요', ly_val),
+                    ('공휴일', int(is_holiday_flag)),
+                    ('업무일', int(is_business_day_flag)),
+                    ('최고기온', hi_temp if is_summer else 0.0),
+                    ('최저기온', lo_temp if is_winter else 0.0),
+                    ('체감온도', feels_like_val),
+                    ('일교차', diurnal_range),
+                )
+                for name, val in feature_values:
+                    idx = rf_max_feature_idx.get(name)
+                    if idx is not None:
+                        date_row[idx] = val
+                # 요일 원-핫: 해당 요일 칸 하나만 1 (나머지는 0으로 초기화됨)
+                weekday_idx = rf_max_weekday_idx[weekday_num]
+                if weekday_idx is not None:
+                    date_row[weekday_idx] = 1.0
 
-            st.success("✅ 날짜 기반 예측 완료!")
-            st.metric("예측 최대수요", f"{predicted_by_date:,.0f} MW")
+                predicted_by_date = float(rf_max_predict_one(date_row))
 
-            # 기준 대비 변화량: 전주 동일 요일 대비로 변경
-            try:
-                base_val = y_t7
-                delta = predicted_by_date - base_val
-                st.metric("전주 동일 요일 대비", f"{delta:,.0f} MW", delta=delta)
-            except Exception:
-                pass
+                st.success("✅ 날짜 기반 예측 완료!")
+                st.metric("예측 최대수요", f"{predicted_by_date:,.0f} MW")
 
-            # 작년 동일 주 요일별 최대수요(2/29는 2/28로 대체) 표시
-            try:
-                prev_year = int(target_ts.year) - 1
+                # 기준 대비 변화량: 전주 동일 요일 대비로 변경
                 try:
-                    anchor = target_ts.replace(year=prev_year)
+                    base_val = y_t7
+                    delta = predicted_by_date - base_val
+                    st.metric("전주 동일 요일 대비", f"{delta:,.0f} MW", delta=delta)
                 except Exception:
-                    if int(target_ts.month) == 2 and int(target_ts.day) == 29:
-                        anchor = pd.Timestamp(year=prev_year, month=2, day=28)
-                    else:
-                        anchor = target_ts - pd.Timedelta(days=365)
-
-                week_start = anchor - pd.Timedelta(days=int(anchor.weekday()))
-                week_dates = [week_start + pd.Timedelta(days=i) for i in range(7)]
+                    pass
 
-                df_lookup = data.copy()
-                df_lookup['날짜'] = pd.to_datetime(df_lookup['날짜'], errors='coerce')
-                weekday_map_disp = {0: '월요일', 1: '화요일', 2: '수요일', 3: '목요일', 4: '금요일', 5: '토요일', 6: '일요일'}
+                # 작년 동일 주 요일별 최대수요(2/29는 2/28로 대체) 표시
+                try:
+                    week_dates = last_year_week_dates(int(target_ts.year), int(target_ts.month), int(target_ts.day))
 
-                rows = []
-                for dti in week_dates:
-                    mask = df_lookup['날짜'].dt.date == dti.date()
-                    if mask.any() and '최대수요' in df_lookup.columns:
-                        val = pd.to_numeric(df_lookup.loc[mask, '최대수요'], errors='coerce').iloc[0]
+                    # 7일치 최대수요를 한 번의 reindex로 조회 (같은 날짜가 여러 행이면 첫 행 기준)
+                    if '최대수요' in data_by_date.columns:
+                        max_series = data_by_date['최대수요']
+                        max_series = max_series[~max_series.index.duplicated(keep='first')]
+                        week_vals = max_series.reindex(week_dates.date).to_numpy()
                     else:
-                        val = np.nan
-                    rows.append({
-                        '요일': weekday_map_disp[int(dti.weekday())],
-                        '날짜': dti.strftime('%Y-%m-%d'),
-                        '최대수요': val,
+                        week_vals = np.full(7, np.nan)
+
+                    df_same_week = pd.DataFrame({
+                        '요일': WEEKDAY_NAMES,  # 주 시작이 월요일이므로 요일 순서 고정
+                        '날짜': week_dates.strftime('%Y-%m-%d'),
+                        '최대수요': week_vals,
                     })
+                    st.subheader("📅 작년 동일 주 요일별 최대수요")
+                    st.dataframe(df_same_week, use_container_width=True)
+                except Exception:
+                    pass
 
-                df_same_week = pd.DataFrame(rows)
-                st.subheader("📅 작년 동일 주 요일별 최대수요")
-                st.dataframe(df_same_week, use_container_width=True)
-            except Exception:
-                pass
+        except Exception as e:
+            st.error(f"❌ 날짜 기반 예측 중 오류가 발생했습니다: {str(e)}")
 
-    except Exception as e:
-        st.error(f"❌ 날짜 기반 예측 중 오류가 발생했습니다: {str(e)}")
+render_date_forecast_panel()
 
 # --- 가스수요 예측 섹션 ---
 st.markdown("---")
 st.subheader("🔥 가스수요 예측")
 st.info("최대수요와 태양광최대를 기반으로 가스수요를 예측합니다.")
 
-# 가스수요 예측 (가능한 경우)
-if hasattr(st.session_state, 'gas_model'):
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.subheader("📝 가스수요 예측 조건 입력")
-        
-        # 요일 선택 + 한국 공휴일/업무일 판정
-        gas_weekday = st.selectbox("요일 선택", ['월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일'], index=0, key="gas_weekday")
-        gas_date_for_flag = st.date_input("예측 기준 날짜(업무일/공휴일 판정)", value=pd.Timestamp.today().date(), key="gas_date_flag")
-        try:
-            kr_holidays = holidays.KR()
-        except Exception:
-            kr_holidays = {}
-        gas_is_holiday = 1 if gas_date_for_flag in kr_holidays else 0
-        gas_weekday_num = ['월요일','화요일','수요일','목요일','금요일','토요일','일요일'].index(gas_weekday)
-        gas_is_business = 1 if (gas_weekday_num < 5 and gas_is_holiday == 0) else 0
-
-        # 최대수요 입력
-        max_demand_input = st.number_input(
-            "최대수요 (MW)",
-            min_value=0.0,
-            max_value=100000.0,
-            value=50000.0,
-            step=1000.0
-        )
-        
-        # 태양광최대 입력
-        solar_max_input = st.number_input(
-            "태양광최대 (MW)",
-            min_value=0.0,
-            max_value=100000.0,
-            value=50000.0,
-            step=1000.0
-        )
-        
-        # 가스수요 예측 버튼
-        predict_gas_button = st.button("🔥 가스수요 예측", type="primary")
-    
-    with col2:
-        st.subheader("📊 가스수요 입력 정보")
-        st.write(f"**요일:** {gas_weekday}")
-        st.write(f"**공휴일:** {'예' if gas_is_holiday else '아니오'}")
-        st.write(f"**업무일:** {'예' if gas_is_business else '아니오'}")
-        st.write(f"**최대수요:** {max_demand_input:,.0f} MW")
-        st.write(f"**태양광최대:** {solar_max_input:,.0f} MW")
-    
-    # 가스수요 예측 실행
-    if predict_gas_button:
-        try:
-            with st.spinner("가스수요 예측을 수행 중..."):
-                # 예측 입력 데이터 준비 (학습 시 사용한 특징과 정합)
-                last_gas = st.session_state.get('last_gas', None)
-                prev_gas = st.session_state.get('prev_gas', None)
-
-                # 변화율 계산 (가능하면), 불가 시 0.0
-                if last_gas is not None and prev_gas is not None and prev_gas != 0:
-                    gas_rate = (last_gas - prev_gas) / prev_gas
-                else:
-                    gas_rate = 0.0
-
-                # 입력 기반 파생
-                residual_load_input = max_demand_input - solar_max_input
-                denom_total = max_demand_input if max_demand_input != 0 else 1.0
-                solar_ratio_total = solar_max_input / denom_total
-                residual_ratio_total = residual_load_input / denom_total
-
-                # 안전한 가스/태양광 비율 (최근 가스가 없다면 0)
-                # 필요 없는 파생 제거: 태양광_가스_비율 사용 안 함
-
-                # 예측 입력을 학습 특징에 맞춰 구성 (누락 컬럼은 0으로 채움)
-                input_dict = {f: 0.0 for f in st.session_state.features_gas}
-                input_dict.update({
-                    '최대수요': max_demand_input,
-                    '태양광최대': solar_max_input,
-                    '잔여부하': residual_load_input,
-                    '최대수요대비_태양광비율': solar_ratio_total,
-                    '최대수요대비_잔여부하비율': residual_ratio_total,
-                    '목표가스_예산': max_demand_input * (st.session_state.get('gas_total_ratio_weekday', 0.0) if gas_is_business else st.session_state.get('gas_total_ratio_weekend', 0.0)) - solar_max_input,
-                    '어제의_가스수요': last_gas if last_gas is not None else 0.0,
-                    '어제의_가스수요_변화율': gas_rate,
-                    '업무일': float(gas_is_business),
-                    '공휴일': float(gas_is_holiday),
-                })
-
-                prediction_input_gas = pd.DataFrame([input_dict])
-                
-                # Step 5에서 학습된 모델의 특징 변수와 동일하게 맞춤
-                if hasattr(st.session_state, 'features_gas'):
-                    prediction_input_gas = prediction_input_gas[st.session_state.features_gas]
-                    
-                    # 가스수요 예측 (단일 모델)
-                    predicted_gas_demand = st.session_state.gas_model.predict(prediction_input_gas)[0]
-                    # 물리적 클리핑: 0 ≤ 가스 ≤ 최대수요
-                    predicted_gas_demand = max(0.0, min(predicted_gas_demand, max_demand_input))
-                    
-                    st.success("✅ 가스수요 예측 완료!")
-                    
-                    # 예측 결과 표시
-                    st.subheader("📊 가스수요 예측 결과")
-                    
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("입력 최대수요", f"{max_demand_input:,.0f} MW")
-                    with col2:
-                        st.metric("입력 태양광최대", f"{solar_max_input:,.0f} MW")
-                    with col3:
-                        st.metric("예측 가스수요", f"{predicted_gas_demand:,.0f} MW")
-                    
-                    # 예측 신뢰도
-                    confidence_gas = min(95, max(60, st.session_state.r2_gas * 100)) if hasattr(st.session_state, 'r2_gas') else 60
-                    st.metric("예측 신뢰도", f"{confidence_gas:.1f}%")
-                    
-                    # 예측 결과 시각화
-                    st.subheader("📈 가스수요 예측 시각화")
-                    
-                    fig_prediction_gas = go.Figure()
-                    
-                    fig_prediction_gas.add_trace(go.Bar(
-                        x=['최대수요', '태양광최대', '예측 가스수요'],
-                        y=[max_demand_input, solar_max_input, predicted_gas_demand],
-                        name='입력값 및 예측값',
-                        marker_color=['red', 'orange', 'green']
-                    ))
-                    
-                    fig_prediction_gas.update_layout(
-                        title="가스수요 예측 결과",
-                        yaxis_title="값 (MW)",
-                        showlegend=True
+# 가스수요 예측 패널 (가능한 경우, 입력 변경/예측 실행 시 이 패널만 재실행)
+@st.fragment
+def render_gas_forecast_panel():
+    if hasattr(st.session_state, 'gas_model'):
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.subheader("📝 가스수요 예측 조건 입력")
+
+            # 요일 선택 + 한국 공휴일/업무일 판정
+            gas_weekday = st.selectbox("요일 선택", WEEKDAY_NAMES, index=0, key="gas_weekday")
+            gas_date_for_flag = st.date_input("예측 기준 날짜(업무일/공휴일 판정)", value=pd.Timestamp.today().date(), key="gas_date_flag")
+            kr_holidays = get_kr_holidays()
+            gas_is_holiday = 1 if gas_date_for_flag in kr_holidays else 0
+            gas_weekday_num = WEEKDAY_INDEX[gas_weekday]
+            gas_is_business = 1 if (gas_weekday_num < 5 and gas_is_holiday == 0) else 0
+
+            # 최대수요 입력
+            max_demand_input = st.number_input(
+                "최대수요 (MW)",
+                min_value=0.0,
+                max_value=100000.0,
+                value=50000.0,
+                step=1000.0
+            )
+
+            # 태양광최대 입력
+            solar_max_input = st.number_input(
+                "태양광최대 (MW)",
+                min_value=0.0,
+                max_value=100000.0,
+                value=50000.0,
+                step=1000.0
+            )
+
+            # 가스수요 예측 버튼
+            predict_gas_button = st.button("🔥 가스수요 예측", type="primary")
+
+        with col2:
+            st.subheader("📊 가스수요 입력 정보")
+            st.write(f"**요일:** {gas_weekday}")
+            st.write(f"**공휴일:** {'예' if gas_is_holiday else '아니오'}")
+            st.write(f"**업무일:** {'예' if gas_is_business else '아니오'}")
+            st.write(f"**최대수요:** {max_demand_input:,.0f} MW")
+            st.write(f"**태양광최대:** {solar_max_input:,.0f} MW")
+
+        # 가스수요 예측 실행
+        if predict_gas_button:
+            try:
+                with st.spinner("가스수요 예측을 수행 중..."):
+                    # 예측 입력 데이터 준비 (학습 시 사용한 특징과 정합)
+                    last_gas = st.session_state.get('last_gas', None)
+                    prev_gas = st.session_state.get('prev_gas', None)
+
+                    # 변화율 계산 (가능하면), 불가 시 0.0
+                    if last_gas is not None and prev_gas is not None and prev_gas != 0:
+                        gas_rate = (last_gas - prev_gas) / prev_gas
+                    else:
+                        gas_rate = 0.0
+
+                    # 입력 기반 파생
+                    residual_load_input = max_demand_input - solar_max_input
+                    denom_total = max_demand_input if max_demand_input != 0 else 1.0
+                    solar_ratio_total = solar_max_input / denom_total
+                    residual_ratio_total = residual_load_input / denom_total
+
+                    # 안전한 가스/태양광 비율 (최근 가스가 없다면 0)
+                    # 필요 없는 파생 제거: 태양광_가스_비율 사용 안 함
+
+                    # 예측 입력을 학습 특징 순서의 numpy 행으로 직접 구성 (누락 컬럼은 0, 학습 시 없던 값은 건너뜀)
+                    gas_feature_idx = st.session_state.get('gas_feature_idx') or {f: i for i, f in enumerate(st.session_state.features_gas)}
+                    gas_row = np.zeros(len(gas_feature_idx), dtype=np.float64)
+                    gas_values = (
+                        ('최대수요', max_demand_input),
+                        ('태양광최대', solar_max_input),
+                        ('잔여부하', residual_load_input),
+                        ('최대수요대비_태양광비율', solar_ratio_total),
+                        ('최대수요대비_잔여부하비율', residual_ratio_total),
+                        ('목표가스_예산', max_demand_input * (st.session_state.get('gas_total_ratio_weekday', 0.0) if gas_is_business else st.session_state.get('gas_total_ratio_weekend', 0.0)) - solar_max_input),
+                        ('어제의_가스수요', last_gas if last_gas is not None else 0.0),
+                        ('어제의_가스수요_변화율', gas_rate),
+                        ('업무일', float(gas_is_business)),
+                        ('공휴일', float(gas_is_holiday)),
                     )
-                    
-                    st.plotly_chart(fig_prediction_gas, use_container_width=True)
-                    
-                    # 예측 근거 설명
-                    st.subheader("📋 예측 근거")
-                    # 모델 중요도
-                    feature_importance = st.session_state.gas_model.feature_importances_
-                    
-                    # Step 5에서 학습된 모델의 실제 특징 변수 사용
+                    for name, val in gas_values:
+                        idx = gas_feature_idx.get(name)
+                        if idx is not None:
+                            gas_row[idx] = val
+
+                    # Step 5에서 학습된 모델의 특징 변수와 동일하게 맞춤
                     if hasattr(st.session_state, 'features_gas'):
-                        if feature_importance is not None:
-                            importance_df = pd.DataFrame({
-                                '특성': st.session_state.features_gas,
-                                '중요도': feature_importance
-                            }).sort_values('중요도', ascending=False)
-                            st.info(f"💡 주요 영향 요인: {importance_df.iloc[0]['특성']} ({importance_df.iloc[0]['중요도']:.1%})")
-                            if len(importance_df) > 1:
-                                st.info(f"💡 보조 영향 요인: {importance_df.iloc[1]['특성']} ({importance_df.iloc[1]['중요도']:.1%})")
+                        gas_predict_one = st.session_state.get('gas_predict_one') or make_fast_predict(st.session_state.gas_model)
+
+                        # 가스수요 예측 (단일 모델)
+                        predicted_gas_demand = gas_predict_one(gas_row)
+                        # 물리적 클리핑: 0 ≤ 가스 ≤ 최대수요
+                        predicted_gas_demand = max(0.0, min(predicted_gas_demand, max_demand_input))
+
+                        st.success("✅ 가스수요 예측 완료!")
+
+                        # 예측 결과 표시
+                        st.subheader("📊 가스수요 예측 결과")
+
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            st.metric("입력 최대수요", f"{max_demand_input:,.0f} MW")
+                        with col2:
+                            st.metric("입력 태양광최대", f"{solar_max_input:,.0f} MW")
+                        with col3:
+                            st.metric("예측 가스수요", f"{predicted_gas_demand:,.0f} MW")
+
+                        # 예측 신뢰도
+                        confidence_gas = min(95, max(60, st.session_state.r2_gas * 100)) if hasattr(st.session_state, 'r2_gas') else 60
+                        st.metric("예측 신뢰도", f"{confidence_gas:.1f}%")
+
+                        # 예측 결과 시각화
+                        st.subheader("📈 가스수요 예측 시각화")
+
+                        # 막대 3개짜리 정적 차트는 Plotly 대신 내장 Vega-Lite 차트로 (전송량/임포트 비용 절감)
+                        chart_gas = pd.DataFrame({
+                            '항목': ['최대수요', '태양광최대', '예측 가스수요'],
+                            '값 (MW)': [max_demand_input, solar_max_input, predicted_gas_demand],
+                            '색상': ['#FF0000', '#FFA500', '#008000'],
+                        })
+                        st.bar_chart(chart_gas, x='항목', y='값 (MW)', color='색상', x_label='', y_label='값 (MW)')
+
+                        # 예측 근거 설명
+                        st.subheader("📋 예측 근거")
+                        # 모델 중요도
+                        feature_importance = st.session_state.gas_model.feature_importances_
+
+                        # Step 5에서 학습된 모델의 실제 특징 변수 사용
+                        if hasattr(st.session_state, 'features_gas'):
+                            if feature_importance is not None and len(feature_importance) > 0:
+                                # 상위 2개만 부분 선택 후 정렬
+                                fi = np.asarray(feature_importance)
+                                names = st.session_state.features_gas
+                                top_k = min(2, len(fi))
+                                top = np.argpartition(fi, -top_k)[-top_k:]
+                                top = top[np.argsort(-fi[top], kind='stable')]
+                                st.info(f"💡 주요 영향 요인: {names[top[0]]} ({fi[top[0]]:.1%})")
+                                if top_k > 1:
+                                    st.info(f"💡 보조 영향 요인: {names[top[1]]} ({fi[top[1]]:.1%})")
+                        else:
+                            st.info("💡 모델의 특징 중요도 정보를 확인할 수 없습니다.")
+
                     else:
-                        st.info("💡 모델의 특징 중요도 정보를 확인할 수 없습니다.")
-                    
-                else:
-                    st.error("❌ 가스수요 예측을 위한 충분한 특성이 없습니다.")
-                    
-        except Exception as e:
-            st.error(f"❌ 가스수요 예측 중 오류가 발생했습니다: {str(e)}")
-            st.info("가스수요 모델 학습이 완료되지 않았거나 입력 데이터에 문제가 있을 수 있습니다.")
+                        st.error("❌ 가스수요 예측을 위한 충분한 특성이 없습니다.")
+
+            except Exception as e:
+                st.error(f"❌ 가스수요 예측 중 오류가 발생했습니다: {str(e)}")
+                st.info("가스수요 모델 학습이 완료되지 않았거나 입력 데이터에 문제가 있을 수 있습니다.")
+
+render_gas_forecast_panel()
 
 st.markdown("---")
 
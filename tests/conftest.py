@@ -0,0 +1,24 @@
+import ast
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+APP_PATH = Path(__file__).resolve().parents[1] / "streamlit_app.py"
+
+
+@pytest.fixture
+def load_app_function():
+    """streamlit_app.py는 임포트 시 앱 전체가 실행되므로 필요한 함수 정의만 떼어 실행"""
+    tree = ast.parse(APP_PATH.read_text(encoding="utf-8"))
+
+    def load(name):
+        node = next(n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name == name)
+        node.decorator_list = []
+        namespace = {"io": io, "np": np, "pd": pd}
+        exec(compile(ast.Module(body=[node], type_ignores=[]), str(APP_PATH), "exec"), namespace)
+        return namespace[name]
+
+    return load
@@ -0,0 +1,15 @@
+import pandas as pd
+
+
+def test_compute_data_stats_counts_categorical_weekday(load_app_function):
+    compute_data_stats = load_app_function("compute_data_stats")
+    df = pd.DataFrame({
+        "요일": pd.Categorical(["월요일", "화요일", "월요일"], categories=["월요일", "화요일"]),
+        "평일": ["평일", "평일", "휴일"],
+        "최대수요": [1.0, 2.0, 3.0],
+    })
+
+    _, categorical_counts, _ = compute_data_stats(df)
+
+    assert set(categorical_counts) == {"요일", "평일"}
+    assert categorical_counts["요일"]["월요일"] == 2
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+FEATURES = ["최고기온", "평균기온", "어제의_최대수요", "공휴일"]
+
+
+def make_training_frame(rng, n_rows=300):
+    X = pd.DataFrame({
+        "최고기온": rng.normal(20, 10, n_rows),
+        "평균기온": rng.normal(15, 9, n_rows),
+        "어제의_최대수요": rng.normal(65000, 5000, n_rows),
+        "공휴일": rng.integers(0, 2, n_rows).astype(float),
+    }, columns=FEATURES)
+    y = 60000 + 150 * X["최고기온"] + 0.3 * X["어제의_최대수요"] - 4000 * X["공휴일"] + rng.normal(0, 500, n_rows)
+    return X, y
+
+
+def rf_split_points(model):
+    """(특성 인덱스, 임계값) - sklearn 트리 분할 노드"""
+    points = []
+    for est in model.estimators_:
+        tree = est.tree_
+        split_nodes = np.nonzero(tree.children_left >= 0)[0]
+        points.extend(zip(tree.feature[split_nodes], tree.threshold[split_nodes]))
+    return points
+
+
+def lgbm_split_points(model):
+    """(특성 인덱스, 임계값) - LightGBM 트리 분할 노드"""
+    trees = model.booster_.trees_to_dataframe()
+    splits = trees[trees["split_feature"].notna()]
+    return [(FEATURES.index(f), t) for f, t in zip(splits["split_feature"], splits["threshold"])]
+
+
+def threshold_rows(X, split_points, rng, n_points=200):
+    """임의 행의 한 특성을 분할 임계값(및 그 float32 값, 바로 위/아래 값)으로 맞춘 행들"""
+    rows = []
+    picks = rng.choice(len(split_points), size=min(n_points, len(split_points)), replace=False)
+    for i in picks:
+        feature, thr = split_points[i]
+        base = X.iloc[rng.integers(len(X))].to_numpy(dtype=np.float64)
+        thr32 = np.float32(thr)
+        for v in (thr, float(thr32), np.nextafter(thr, np.inf), np.nextafter(thr, -np.inf),
+                  float(np.nextafter(thr32, np.float32(np.inf))), float(np.nextafter(thr32, np.float32(-np.inf)))):
+            row = base.copy()
+            row[feature] = v
+            rows.append(row)
+    return np.array(rows)
+
+
+def fit_model(kind, X, y):
+    if kind == "rf":
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(n_estimators=20, max_depth=8, random_state=0).fit(X, y)
+    lightgbm = pytest.importorskip("lightgbm")
+    return lightgbm.LGBMRegressor(n_estimators=30, num_leaves=15, min_child_samples=5, random_state=0, verbose=-1).fit(X, y)
+
+
+@pytest.mark.parametrize("kind", ["rf", "lgbm"])
+def test_make_fast_predict_matches_model_predict(kind, load_app_function):
+    pytest.importorskip("sklearn")
+    rng = np.random.default_rng(0)
+    X, y = make_training_frame(rng)
+    model = fit_model(kind, X, y)
+    make_fast_predict = load_app_function("make_fast_predict")
+    fast_predict = make_fast_predict(model)
+
+    split_points = rf_split_points(model) if kind == "rf" else lgbm_split_points(model)
+    random_rows = make_training_frame(np.random.default_rng(1), n_rows=100)[0].to_numpy(dtype=np.float64)
+    rows = np.vstack([random_rows, threshold_rows(X, split_points, rng)])
+
+    expected = model.predict(pd.DataFrame(rows, columns=FEATURES))
+    actual = np.array([fast_predict(row) for row in rows])
+
+    assert np.allclose(actual, expected)
@@ -0,0 +1,33 @@
+import io
+
+import pandas as pd
+import pytest
+
+
+@pytest.mark.parametrize("engine_module", ["xlsxwriter", "openpyxl"])
+def test_to_excel_bytes_round_trip(engine_module, monkeypatch, load_app_function):
+    pytest.importorskip("openpyxl")  # read_excel 용
+    if engine_module == "xlsxwriter":
+        pytest.importorskip("xlsxwriter")
+    else:
+        # xlsxwriter가 없는 환경의 openpyxl 대체 경로
+        real_writer = pd.ExcelWriter
+
+        def writer_without_xlsxwriter(*args, engine=None, **kwargs):
+            if engine == "xlsxwriter":
+                raise ImportError("xlsxwriter")
+            return real_writer(*args, engine=engine, **kwargs)
+
+        monkeypatch.setattr(pd, "ExcelWriter", writer_without_xlsxwriter)
+
+    to_excel_bytes = load_app_function("to_excel_bytes")
+    df = pd.DataFrame({
+        "날짜": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03"]),
+        "최대수요": [61000.0, 62500.5, 60100.0],
+        "평일": ["평일", "평일", "휴일"],
+        "공휴일": [0, 0, 1],
+    })
+
+    result = pd.read_excel(io.BytesIO(to_excel_bytes(df)), sheet_name="Power_Data")
+
+    pd.testing.assert_frame_equal(result, df, check_dtype=False)
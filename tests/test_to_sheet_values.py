@@ -0,0 +1,16 @@
+import pandas as pd
+
+
+def test_to_sheet_values_handles_non_string_object_columns(load_app_function):
+    to_sheet_values = load_app_function("to_sheet_values")
+    df = pd.DataFrame({
+        "날짜": pd.to_datetime(["2024-01-01", None]),
+        "정수": pd.Series([1, 2], dtype=object),  # 편집기가 되돌려 준 비문자열 object 컬럼
+        "혼합": pd.Series(["2024-01-02T00:00:00", 5], dtype=object),
+        "빈값": pd.Series([None, None], dtype=object),
+    })
+
+    assert to_sheet_values(df) == [
+        ["2024-01-01", "1", "2024-01-02", ""],
+        ["", "2", "5", ""],
+    ]